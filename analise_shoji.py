@@ -0,0 +1,261 @@
+import argparse
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+import pandas as pd
+import nucleo_shoji as nucleo
+from ataques_shoji import tabela_armas
+from banco_shoji import CAMINHO_BANCO, BancoRolagens
+from nucleo_shoji import Build
+from pericias_shoji import chance_sucesso
+
+# ---------------------------
+# Análise da campanha (streaming sobre o histórico arquivado)
+# ---------------------------
+# Lê as rolagens uma a uma (SQLite em lotes pelo BancoRolagens.iterar, JSONL linha a linha, Parquet
+# por row group) e só guarda contadores por arma / habilidade / perícia / sessão: a memória não cresce
+# com o tamanho do histórico, só com quantas armas, habilidades e sessões existem.
+#   python analise_shoji.py                          -> banco padrão (SHOJI_BANCO)
+#   python analise_shoji.py campanha.jsonl outra.parquet --cd 10 15 20
+# Aceita as linhas do banco, do exportar_shoji (jsonl/parquet) e do spill do historico_shoji.
+
+CDS_REFERENCIA = (10, 15, 20, 25)
+
+def _chance_d20(crit_threshold: int, vantagem: bool) -> float:
+    p = min(max((21 - crit_threshold) / 20, 0.0), 1.0)
+    return 1 - (1 - p) ** 2 if vantagem else p
+
+@lru_cache(maxsize=1024)
+def _chance_crit_build(habilidade: str, build: Build) -> float:
+    plano = nucleo.compilar_plano(habilidade, build)
+    return _chance_d20(plano.crit_threshold, plano.vantagem)
+
+def chance_crit_teorica(payload: dict, invocacao: dict | None) -> float | None:
+    """
+    P(crit) que a rolagem tinha: pelo Build da invocação (pega Golpe Letal, vantagem...) ou, em
+    rolagem antiga sem invocação, pela margem base da arma (+ vantagem se o payload tiver os 2 d20).
+    """
+    if invocacao and invocacao.get("tipo") == "habilidade":
+        try:
+            return _chance_crit_build(invocacao["nome"], Build(**invocacao["build"]))
+        except (KeyError, TypeError, ValueError):
+            pass
+    info = tabela_armas.get(payload.get("Arma"))
+    if info is None:
+        return None
+    return _chance_d20(info["crit_threshold"], "D20 (vantagem)" in payload)
+
+@dataclass(slots=True)
+class _Soma:
+    n: int = 0
+    soma: float = 0.0
+    soma_quad: float = 0.0
+    minimo: float | None = None
+    maximo: float | None = None
+
+    def add(self, x: float):
+        self.n += 1
+        self.soma += x
+        self.soma_quad += x * x
+        self.minimo = x if self.minimo is None else min(self.minimo, x)
+        self.maximo = x if self.maximo is None else max(self.maximo, x)
+
+    def media(self) -> float:
+        return self.soma / self.n if self.n else float("nan")
+
+    def desvio(self) -> float:
+        if self.n < 2:
+            return float("nan")
+        return max(self.soma_quad - self.soma * self.soma / self.n, 0.0) ** 0.5 / (self.n - 1) ** 0.5
+
+def build_da_rolagem(payload: dict, invocacao: dict | None) -> Build | None:
+    """
+    Build da rolagem: o da invocação (replay_shoji) ou, em rolagem antiga, só os Golpes Pessoais que o
+    payload mostra no extra "Golpe Pessoal" (o suficiente pro custo em PE).
+    """
+    if invocacao and invocacao.get("tipo") == "habilidade":
+        try:
+            return Build(**invocacao["build"])
+        except (KeyError, TypeError):
+            pass
+    golpes = payload.get("Golpe Pessoal")
+    if not isinstance(golpes, str):
+        return None
+    return Build(payload.get("Arma") or "", gp_elemental="Elemental" in golpes, gp_letal="Letal" in golpes,
+                 gp_preciso="Preciso" in golpes)
+
+def normalizar_rolagem(item: dict, sessao_padrao: str | None = None) -> dict:
+    """Linha do banco / do exportar_shoji / do spill -> {sessao, msg, payload (dict), invocacao (dict|None)}."""
+    payload = item.get("payload")
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    invocacao = item.get("invocacao")
+    if isinstance(invocacao, str):
+        invocacao = json.loads(invocacao) if invocacao else None
+    return {
+        "sessao": item.get("sessao") or sessao_padrao,
+        "msg": item.get("msg") or item.get("titulo") or "",
+        "payload": payload or {},
+        "invocacao": invocacao,
+    }
+
+class AnaliseCampanha:
+    """
+    Acumula as métricas rolagem a rolagem (chame adicionar() quantas vezes quiser, depois os relatórios).
+    PE por sessão: o "Custo" do payload, se tiver; senão custos_pe[habilidade] (os da mesa, padrão 0)
+    + o Golpe Pessoal do Build (Preciso conta os usos dentro da sessão).
+    """
+
+    def __init__(self, cds: tuple[int, ...] = CDS_REFERENCIA, custos_pe: dict | None = None):
+        self.cds = tuple(int(cd) for cd in cds)
+        self.custos_pe = custos_pe or {}
+        self.total = 0
+        self._crit = {}      # arma -> [ataques, crits, soma de P(crit) teórica, ataques com P teórica]
+        self._dano = {}      # habilidade -> _Soma
+        self._pericias = {}  # perícia -> [testes, soma do total, passou por CD, soma de P(passar) por CD]
+        self._sessoes = {}   # sessão -> [rolagens, PE gasto, PE do Golpe Pessoal, usos do Preciso]
+
+    def adicionar(self, item: dict, sessao_padrao: str | None = None):
+        r = normalizar_rolagem(item, sessao_padrao)
+        payload, invocacao = r["payload"], r["invocacao"]
+        self.total += 1
+        pericia = invocacao["nome"] if invocacao and invocacao.get("tipo") == "pericia" else (
+            r["msg"].removeprefix("Perícia: ") if r["msg"].startswith("Perícia: ") else None)
+        habilidade = invocacao["nome"] if invocacao and invocacao.get("tipo") == "habilidade" else r["msg"]
+
+        if pericia is not None:
+            self._teste(pericia, payload)
+        else:
+            if payload.get("Dano") is not None:
+                self._dano.setdefault(habilidade, _Soma()).add(float(payload["Dano"]))
+            if payload.get("Arma") is not None and payload.get("Crit") is not None:
+                c = self._crit.setdefault(payload["Arma"], [0, 0, 0.0, 0])
+                c[0] += 1
+                c[1] += bool(payload["Crit"])
+                p = chance_crit_teorica(payload, invocacao)
+                if p is not None:
+                    c[2] += p
+                    c[3] += 1
+
+        s = self._sessoes.setdefault(r["sessao"] or "?", [0, 0, 0, 0])
+        s[0] += 1
+        custo = payload.get("Custo")
+        if custo is not None:
+            s[1] += int(custo)
+        elif pericia is None:
+            build = build_da_rolagem(payload, invocacao)
+            gp = nucleo.custo_golpe_pessoal(build, s[3]) if build is not None else 0
+            s[1] += int(self.custos_pe.get(habilidade, 0)) + gp
+            s[2] += gp
+            s[3] += build is not None and build.gp_preciso
+
+    def _teste(self, pericia: str, payload: dict):
+        total, d20 = payload.get("Rolagem de Ataque"), payload.get("D20")
+        if total is None:
+            return
+        p = self._pericias.setdefault(pericia, [0, 0, [0] * len(self.cds), [0.0] * len(self.cds)])
+        p[0] += 1
+        p[1] += total
+        for i, cd in enumerate(self.cds):
+            p[2][i] += total >= cd
+            if d20 is not None:
+                p[3][i] += chance_sucesso(total - d20, cd)
+
+    def consumir(self, itens, sessao_padrao: str | None = None) -> "AnaliseCampanha":
+        for item in itens:
+            self.adicionar(item, sessao_padrao)
+        return self
+
+    # --- relatórios (pequenos: uma linha por arma / habilidade / perícia / sessão)
+
+    def crit_por_arma(self) -> pd.DataFrame:
+        linhas = [{"Arma": arma, "Ataques": n, "Crits": crits, "Crit %": 100 * crits / n,
+                   "Teórico %": 100 * soma_p / n_p if n_p else float("nan")}
+                  for arma, (n, crits, soma_p, n_p) in self._crit.items()]
+        return pd.DataFrame(linhas, columns=["Arma", "Ataques", "Crits", "Crit %", "Teórico %"]).round(2)
+
+    def dano_por_habilidade(self) -> pd.DataFrame:
+        linhas = [{"Habilidade": h, "Rolagens": s.n, "Dano médio": s.media(), "Desvio": s.desvio(),
+                   "Mín": s.minimo, "Máx": s.maximo} for h, s in self._dano.items()]
+        return pd.DataFrame(linhas, columns=["Habilidade", "Rolagens", "Dano médio", "Desvio", "Mín", "Máx"]).round(2)
+
+    def pericias(self) -> pd.DataFrame:
+        linhas = []
+        for pericia, (n, soma, passou, soma_p) in self._pericias.items():
+            linha = {"Perícia": pericia, "Testes": n, "Total médio": soma / n}
+            for cd, k, p in zip(self.cds, passou, soma_p):
+                linha[f"CD {cd} %"] = 100 * k / n
+                linha[f"CD {cd} teórico %"] = 100 * p / n
+            linhas.append(linha)
+        return pd.DataFrame(linhas).round(2)
+
+    def pe_por_sessao(self) -> pd.DataFrame:
+        linhas = [{"Sessão": s, "Rolagens": n, "PE gasto": pe, "PE Golpe Pessoal": gp}
+                  for s, (n, pe, gp, _) in self._sessoes.items()]
+        return pd.DataFrame(linhas, columns=["Sessão", "Rolagens", "PE gasto", "PE Golpe Pessoal"])
+
+# ---------------------------
+# Fontes (todas geradores: nada é carregado inteiro)
+# ---------------------------
+
+def ler_jsonl(caminho: str):
+    with open(caminho, encoding="utf-8") as f:
+        for linha in f:
+            if linha.strip():
+                yield json.loads(linha)
+
+def ler_parquet(caminho: str, tamanho_lote: int = 5000):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Ler Parquet precisa do pyarrow (pip install pyarrow)") from e
+    for lote in pq.ParquetFile(caminho).iter_batches(batch_size=tamanho_lote):
+        yield from lote.to_pylist()
+
+def analisar_arquivo(analise: AnaliseCampanha, caminho: str, tamanho_lote: int = 5000) -> AnaliseCampanha:
+    """JSONL (exportar_shoji ou spill do histórico) ou Parquet do exportar_shoji."""
+    if caminho.endswith(".parquet"):
+        return analise.consumir(ler_parquet(caminho, tamanho_lote))
+    # spill não tem coluna de sessão: usa o nome do arquivo
+    return analise.consumir(ler_jsonl(caminho), sessao_padrao=os.path.splitext(os.path.basename(caminho))[0])
+
+def analisar_banco(analise: AnaliseCampanha, banco: BancoRolagens, sessao: str | None = None,
+                   tamanho_lote: int = 5000) -> AnaliseCampanha:
+    return analise.consumir(banco.iterar(sessao=sessao, tamanho_lote=tamanho_lote))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Métricas da campanha a partir do histórico de rolagens.")
+    parser.add_argument("arquivos", nargs="*", help=".jsonl / .parquet (sem arquivos: lê o banco)")
+    parser.add_argument("--banco", default=CAMINHO_BANCO)
+    parser.add_argument("--sessao", default=None, help="só essa sessão (no banco)")
+    parser.add_argument("--cd", type=int, nargs="+", default=list(CDS_REFERENCIA), help="CDs de referência das perícias")
+    parser.add_argument("--lote", type=int, default=5000)
+    parser.add_argument("--custo", action="append", default=[], metavar="HABILIDADE=PE",
+                        help="custo em PE de uma habilidade (repita; sem isso só o Golpe Pessoal conta)")
+    a = parser.parse_args()
+
+    custos = {}
+    for item in a.custo:
+        nome, sep, pe = item.rpartition("=")
+        if not sep or not pe.strip().isdigit():
+            parser.error(f"--custo precisa ser HABILIDADE=PE: {item!r}")
+        custos[nome.strip()] = int(pe)
+
+    analise = AnaliseCampanha(cds=tuple(a.cd), custos_pe=custos)
+    if a.arquivos:
+        for caminho in a.arquivos:
+            analisar_arquivo(analise, caminho, a.lote)
+    else:
+        if not os.path.exists(a.banco):
+            parser.error(f"banco não encontrado: {a.banco}")
+        analisar_banco(analise, BancoRolagens(a.banco), a.sessao, a.lote)
+
+    print(f"{analise.total} rolagens\n")
+    for titulo, df in (("Crit por arma", analise.crit_por_arma()),
+                       ("Dano por habilidade", analise.dano_por_habilidade()),
+                       ("Perícias", analise.pericias()),
+                       ("PE por sessão", analise.pe_por_sessao())):
+        print(f"## {titulo}")
+        print(df.to_string(index=False) if not df.empty else "(nada)")
+        print()
@@ -1,298 +1,138 @@
-import random
-import math
-from datetime import datetime
-from html import escape
-import pandas as pd
-import numpy as np
+from dados_shoji import backend_atual
+from expressoes_shoji import compilar
+from resultado_shoji import Resultado
 
-def rolar_pericia(nome: str, total: int) -> dict:
+def rolar_pericia(nome: str, total: int) -> Resultado:
     """Rola 1d20 + total para teste de perícia."""
-    d20 = random.randint(1, 20)
-    return {
-        "Habilidade": f"Perícia – {nome}",
-        "Rolagens": [d20],            # mostra o d20
-        "Ataque": d20 + int(total),   # 'show_result' exibe como Ataque/Teste
-    }
+    d20 = dado(20)[0]
+    return Resultado(
+        habilidade=f"Perícia – {nome}",
+        d20=d20,
+        ataque_total=d20 + int(total),   # 'show_result' exibe como Resultado e D20/Total
+    )
 
 def dado(faces: int, vezes: int = 1) -> list[int]:
-    """Rola 'vezes' dados de 'faces' e retorna a lista com os resultados."""
-    return [random.randint(1, faces) for _ in range(vezes)]
+    """Rola 'vezes' dados de 'faces' e retorna a lista com os resultados (backend ativo, ver dados_shoji)."""
+    return backend_atual().rolar(faces, vezes)
 
 def dado_cura_aprimorada(faces: int, vezes: int = 1) -> list[int]:
-    return [random.randint(3, faces) for _ in range(vezes)]
+    return backend_atual().rolar(faces, vezes, minimo=3)
 
 def mod(atr: int) -> int:
     """Modificador de atributo: floor((atributo-10)/2)."""
     return (atr - 10) // 2
 
-class ataque_armado:
+# ---------------------------
+# Armas (em notação de dados, ver expressoes_shoji)
+# ---------------------------
+# ataque = d20 + acerto e a partir de qual d20 é crítico; dano / dano_crit = dados + bônus fixo.
+# É a única fonte dos números das armas: rolagem individual, lote, distribuição exata e otimizador
+# saem todos daqui.
+definicoes_armas = {
+    'Espada Gancho (G 4)': {
+        "nome": "Espada Gancho",
+        "ataque": "1d20+18 crit>=19", "dano": "1d8+12", "dano_crit": "crit 6d8+12",
+        "descricao": "Toma gancho, piranha",
+        "descricao_crit": "Toma gancho de BANDIDO, piranha (CRIT)",
+    },
+    'Espada Dupla (G 4)': {
+        "nome": "Espada Dupla",
+        "ataque": "1d20+19 crit>=19", "dano": "3d6+12", "dano_crit": "crit 10d6+12",
+        "descricao": "Quer duas? Então vai tomando.",
+        "descricao_crit": "Quer duas? Então vai tomando FIRME (CRIT)",
+    },
+    'Espada Colossal (G 4)': {
+        "nome": "Espada Colossal",
+        "ataque": "1d20+18 crit>=20", "dano": "3d8+12", "dano_crit": "crit 10d8+12",
+        "descricao": "Quer ver o meu colossal?",
+        "descricao_crit": "Quer o meu colosso? (CRIT)",
+    },
+    'Nunchako Pesado (G 4)': {
+        "nome": "Nunchako Pesado",
+        "ataque": "1d20+16 crit>=19", "dano": "3d8+12", "dano_crit": "crit 10d8+12",
+        "descricao": "Porrete estilo oriental",
+        "descricao_crit": "Cacetete PMERJ, perfeito pra agredir civis (CRIT)",
+    },
+    'Lança Grande (G 4)': {
+        "nome": "Lança Grande",
+        "ataque": "1d20+16 crit>=20", "dano": "3d8+12", "dano_crit": "crit 10d8+12",
+        "descricao": "Toma lança",
+        "descricao_crit": "Lança tenebrosa amaldiçoada (CRIT)",
+    },
+    'Machado Grande (G 4)': {
+        "nome": "Machado Grande",
+        "ataque": "1d20+16 crit>=20", "dano": "3d6+12", "dano_crit": "crit 10d8+12",
+        "descricao": "Toma machado",
+        "descricao_crit": "Machadada potente no teu roxo (CRIT)",
+    },
+    'Foice Grande (G 4) Afiada': {
+        "nome": "Foice Grande",
+        "ataque": "1d20+16 crit>=20", "dano": "3d10+12", "dano_crit": "crit 10d10+12",
+        "descricao": "Toma foice",
+        "descricao_crit": "Foice potente no teu roxo (CRIT)",
+    },
+    'Soqueira (G 4)(Aç.B. TP 6m 1PE)': {
+        "nome": "Soqueira",
+        "ataque": "1d20+16 crit>=20", "dano": "3d6+12", "dano_crit": "crit 10d8+12",
+        "descricao": "Toma soco",
+        "descricao_crit": "Socada potente no teu roxo (CRIT)",
+    },
+    'Cardume de Adagas (G 3)': {
+        "nome": "Cardume de Adagas",
+        "ataque": "1d20+16 crit>=19", "dano": "1d4+12", "dano_crit": "crit 6d4+12",
+        "descricao": "Toma uma porrada de adagas",
+        "descricao_crit": "Cardume potente entrando firme no teu roxo (CRIT)",
+    },
+    'Adaga de Aparar (G 4)': {
+        "nome": "Adaga de Aparar",
+        "ataque": "1d20+16 crit>=19", "dano": "1d4+12", "dano_crit": "crit 6d4+12",
+        "descricao": "Toma uma porrada de adagas",
+        "descricao_crit": "Cardume potente entrando firme no teu roxo (CRIT)",
+    },
+}
+
+def _compilar_arma(arma: str, dados: dict) -> dict:
+    """Compila as expressões e expõe os números crus (o nucleo_shoji monta o ataque, o lote_shoji rola em massa)."""
+    ataque = compilar(dados["ataque"])
+    dano = compilar(dados["dano"])
+    dano_crit = compilar(dados["dano_crit"])
+    if len(ataque.dados) != 1 or ataque.dados[0] != (20, 1) or ataque.crit_threshold is None:
+        raise ValueError(f"Ataque de {arma} tem que ser 1d20+N crit>=M: {dados['ataque']!r}")
+    if len(dano.dados) != 1 or len(dano_crit.dados) != 1 or dano.bonus != dano_crit.bonus:
+        raise ValueError(f"Dano de {arma} tem que ser um tipo de dado + o mesmo bônus no crit")
+    return {
+        **dados,
+        "ataque": ataque, "dano": dano, "dano_crit": dano_crit,
+        "acerto": ataque.bonus, "crit_threshold": ataque.crit_threshold,
+        "dados": dano.dados[0], "dados_crit": dano_crit.dados[0], "bonus_dano": dano.bonus,
+    }
+
+# dados / dados_crit = (faces, quantidade)
+tabela_armas = {arma: _compilar_arma(arma, dados) for arma, dados in definicoes_armas.items()}
+
+# ---------------------------
+# Buffs (estilo oculto, kukan) e dado da arma usado nos dados extras
+# ---------------------------
+# Estilo oculto adiciona o valor tanto em dano quanto na rolagem de ataque
+adicional_estilo_oculto = {
+     'Nenhum': 0,
+     '1º Fluxo': 1,
+     '2º Fluxo': 2,
+     '3º Fluxo': 3, 
+     '4º Fluxo': 4, 
+     '5º Fluxo': 5, 
+     '6º Fluxo': 6, 
+     '7º Fluxo': 7, 
+     '8º Fluxo': 8, 
+     '9º Fluxo': 9, 
+     '10ºFluxo': 10,
+}
+
+adicional_kukan = {
+     'Nenhum': 0,
+     'Kukan no Kyoka': 7,
+     'Kukan no Kyoka - Ritual': 16,
+}
 
-    def espada_gancho():
-        rols = dado(8, 1)
-        roll_20 = dado(20)[0]
-        acerto = 18
-        crit_threshold = 19
-        crit_rols = dado(8,6)
-        if roll_20 >= crit_threshold:
-            return {
-            "Habilidade": "Espada Gancho",
-            "Alcance": "Pessoal",
-            "Descrição": "Toma gancho de BANDIDO, piranha (CRIT)",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": crit_rols,
-            "Dano": sum(crit_rols)+12,
-            }
-        else:
-            return {
-            "Habilidade": "Espada Gancho",
-            "Alcance": "Pessoal",
-            "Descrição": "Toma gancho, piranha",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": rols,
-            "Dano": sum(rols)+12,
-            }
-        
-    def espada_dupla():
-        rols = dado(6, 3)
-        roll_20 = dado(20)[0]
-        acerto = 19
-        crit_threshold = 19
-        crit_rols = dado(6,10)
-        if roll_20 >= crit_threshold:
-            return {
-            "Habilidade": "Espada Dupla",
-            "Alcance": "Pessoal",
-            "Descrição": "Quer duas? Então vai tomando FIRME (CRIT)",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": crit_rols,
-            "Dano": sum(crit_rols)+12,
-            }
-        else:
-            return {
-            "Habilidade": "Espada Gancho",
-            "Alcance": "Pessoal",
-            "Descrição": "Quer duas? Então vai tomando.",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": rols,
-            "Dano": sum(rols)+12,
-            }
-        
-    def espada_colossal():
-        rols = dado(8, 3)
-        acerto = 18
-        roll_20 = dado(20)[0]
-        crit_threshold = 20
-        crit_rols = dado(8,10)
-        if roll_20 >= crit_threshold:
-            return {
-            "Habilidade": "Espada Colossal",
-            "Alcance": "Pessoal",
-            "Descrição": "Quer o meu colosso? (CRIT)",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": crit_rols,
-            "Dano": sum(crit_rols)+12,
-            }
-        else:
-            return {
-            "Habilidade": "Espada Colossal",
-            "Alcance": "Pessoal",
-            "Descrição": "Quer ver o meu colossal?",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": rols,
-            "Dano": sum(rols)+12,
-            }
-        
-    def nunchako_pesado():
-        rols = dado(8, 3)
-        roll_20 = dado(20)[0]
-        acerto = 16
-        crit_threshold = 19
-        crit_rols = dado(8,10)
-        if roll_20 >= crit_threshold:
-            return {
-            "Habilidade": "Nunchaco Pesado",
-            "Alcance": "Pessoal",
-            "Descrição": "Cacetete PMERJ, perfeito pra agredir civis (CRIT)",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": crit_rols,
-            "Dano": sum(crit_rols)+12,
-            }
-        else:
-            return {
-            "Habilidade": "Nunchako Pesado",
-            "Alcance": "Pessoal",
-            "Descrição": "Porrete estilo oriental",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": rols,
-            "Dano": sum(rols)+12,
-            }
-        
-    def lanca_grande():
-        rols = dado(8, 3)
-        roll_20 = dado(20)[0]
-        acerto = 16
-        crit_threshold = 20
-        crit_rols = dado(8,10)
-        if roll_20 >= crit_threshold:
-            return {
-            "Habilidade": "Lança Grande",
-            "Alcance": "Pessoal",
-            "Descrição": "Lança tenebrosa amaldiçoada (CRIT)",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": crit_rols,
-            "Dano": sum(crit_rols)+12,
-            }
-        else:
-            return {
-            "Habilidade": "Lança Grande",
-            "Alcance": "Pessoal",
-            "Descrição": "Toma lança",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": rols,
-            "Dano": sum(rols)+12,
-            }
-        
-    def machado_grande():
-        rols = dado(6, 3)
-        roll_20 = dado(20)[0]
-        acerto = 16
-        crit_threshold = 20
-        crit_rols = dado(8,10)
-        if roll_20 >= crit_threshold:
-            return {
-            "Habilidade": "Machado Grande",
-            "Alcance": "Pessoal",
-            "Descrição": "Machadada potente no teu roxo (CRIT)",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": crit_rols,
-            "Dano": sum(crit_rols)+12,
-            }
-        else:
-            return {
-            "Habilidade": "Machado Grande",
-            "Alcance": "Pessoal",
-            "Descrição": "Toma machado",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": rols,
-            "Dano": sum(rols)+12,
-            }
-        
-    def foice_grande():
-        rols = dado(10, 3)
-        roll_20 = dado(20)[0]
-        acerto = 16
-        crit_threshold = 20
-        crit_rols = dado(10,10)
-        if roll_20 >= crit_threshold:
-            return {
-            "Habilidade": "Foice Grande",
-            "Alcance": "Pessoal",
-            "Descrição": "Foice potente no teu roxo (CRIT)",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": crit_rols,
-            "Dano": sum(crit_rols)+12,
-            }
-        else:
-            return {
-            "Habilidade": "Foice Grande",
-            "Alcance": "Pessoal",
-            "Descrição": "Toma foice",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": rols,
-            "Dano": sum(rols)+12,
-            }
-        
-    def soqueira():
-        rols = dado(6, 3)
-        roll_20 = dado(20)[0]
-        acerto = 16
-        crit_threshold = 20
-        crit_rols = dado(8,10)
-        if roll_20 >= crit_threshold:
-            return {
-            "Habilidade": "Soqueira",
-            "Alcance": "Pessoal",
-            "Descrição": "Socada potente no teu roxo (CRIT)",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": crit_rols,
-            "Dano": sum(crit_rols)+12,
-            }
-        else:
-            return {
-            "Habilidade": "Machado Grande",
-            "Alcance": "Pessoal",
-            "Descrição": "Toma soco",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": rols,
-            "Dano": sum(rols)+12,
-            }
-        
-    def cardume_de_adagas():
-        rols = dado(4, 1)
-        roll_20 = dado(20)[0]
-        acerto = 16
-        crit_threshold = 19
-        crit_rols = dado(4,6)
-        if roll_20 >= crit_threshold:
-            return {
-            "Habilidade": "Cardume de Adagas",
-            "Alcance": "Pessoal",
-            "Descrição": "Cardume potente entrando firme no teu roxo (CRIT)",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": crit_rols,
-            "Dano": sum(crit_rols)+12,
-            }
-        else:
-            return {
-            "Habilidade": "Cardume de Adagas",
-            "Alcance": "Pessoal",
-            "Descrição": "Toma uma porrada de adagas",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": rols,
-            "Dano": sum(rols)+12,
-            }
-        
-    def adaga_de_aparar():
-        rols = dado(4, 1)
-        roll_20 = dado(20)[0]
-        acerto = 16
-        crit_threshold = 19
-        crit_rols = dado(4,6)
-        if roll_20 >= crit_threshold:
-            return {
-            "Habilidade": "Adaga de Aparar",
-            "Alcance": "Pessoal",
-            "Descrição": "Cardume potente entrando firme no teu roxo (CRIT)",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": crit_rols,
-            "Dano": sum(crit_rols)+12,
-            }
-        else:
-            return {
-            "Habilidade": "Adaga de Aparar",
-            "Alcance": "Pessoal",
-            "Descrição": "Toma uma porrada de adagas",
-            "D20": roll_20,
-            "Rolagem de Ataque": roll_20+acerto,
-            "Rolagens": rols,
-            "Dano": sum(rols)+12,
-            }
+# dado da arma (o mesmo da expressão de dano) usado nos dados extras de postura/habilidades
+arma_dano_faces = {arma: info["dados"][0] for arma, info in tabela_armas.items()}
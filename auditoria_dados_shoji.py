@@ -0,0 +1,252 @@
+import argparse
+import math
+import os
+import sys
+import time
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import nucleo_shoji as nucleo
+from analise_shoji import ler_jsonl, ler_parquet, normalizar_rolagem
+from ataques_shoji import arma_dano_faces
+from banco_shoji import CAMINHO_BANCO, BancoRolagens
+from dados_shoji import BackendNumpy
+from nucleo_shoji import Build
+
+# ---------------------------
+# Auditoria dos dados (o dado() é justo?)
+# ---------------------------
+# Por tamanho de dado, três testes em streaming (lote a lote, memória constante):
+#   - qui-quadrado: as faces saem com a mesma frequência?
+#   - correlação serial (lag 1): um resultado puxa o próximo?
+#   - runs (acima/abaixo da média, Wald-Wolfowitz): sequências longas demais ou alternância demais?
+# Roda contra o backend (dezenas de milhões de amostras, puxadas em array) ou contra as rolagens
+# reais arquivadas (SQLite / JSONL / Parquet), e mostra quanto tempo cada dado levou.
+#   python auditoria_dados_shoji.py -n 10000000 [--seed 1]
+#   python auditoria_dados_shoji.py --banco [rolagens.sqlite3]    (sem caminho: o banco padrão, SHOJI_BANCO)
+#   python auditoria_dados_shoji.py --arquivos campanha.jsonl ...
+# Sem scipy: os p-valores saem da gama incompleta (qui-quadrado) e da normal (erfc).
+
+FACES_PADRAO = tuple(sorted(set(arma_dano_faces.values()) | {4, 6, 8, 10, 12, 20}))
+ALFA_PADRAO = 0.001  # são 3 testes x 6 dados: com 0.01 quase sempre algum "falharia" por acaso
+
+def _gama_q(a: float, x: float) -> float:
+    """Gama incompleta superior regularizada Q(a, x) (série pra x < a+1, fração contínua no resto)."""
+    if x <= 0:
+        return 1.0
+    log_pre = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1:
+        termo = soma = 1.0 / a
+        n = a
+        for _ in range(1000):
+            n += 1
+            termo *= x / n
+            soma += termo
+            if abs(termo) < abs(soma) * 1e-15:
+                break
+        return max(0.0, 1.0 - soma * math.exp(log_pre))
+    # Lentz
+    pequeno = 1e-300
+    b = x + 1 - a
+    c = 1 / pequeno
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = pequeno if abs(d) < pequeno else d
+        c = b + an / c
+        c = pequeno if abs(c) < pequeno else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return min(1.0, math.exp(log_pre) * h)
+
+def p_qui_quadrado(chi2: float, gl: int) -> float:
+    return _gama_q(gl / 2, chi2 / 2)
+
+def p_normal(z: float) -> float:
+    """p bicaudal de um z ~ N(0, 1)."""
+    return math.erfc(abs(z) / math.sqrt(2))
+
+class TesteDado:
+    """Acumula um fluxo de resultados de um dX (adicionar() em lotes) e roda os três testes no fim."""
+
+    def __init__(self, faces: int, minimo: int = 1):
+        self.faces = faces
+        self.minimo = minimo
+        self.contagem = np.zeros(faces + 1, dtype=np.int64)
+        self.fora = 0              # resultados fora de minimo..faces (dado quebrado, sem discussão)
+        self.n = 0
+        self.soma = 0
+        self.soma_quad = 0
+        self.soma_lag = 0          # soma de x[t] * x[t+1]
+        self.primeiro = None
+        self.ultimo = None
+        self.acima = 0             # runs: quantos acima da média e quantas trocas acima/abaixo
+        self.trocas = 0
+        self.segundos = 0.0
+
+    def adicionar(self, x: np.ndarray):
+        inicio = time.perf_counter()
+        x = np.asarray(x, dtype=np.int64).ravel()
+        if x.size:
+            validos = (x >= self.minimo) & (x <= self.faces)
+            self.fora += int(x.size - validos.sum())
+            x = x[validos]
+        if x.size:
+            self.contagem += np.bincount(x, minlength=self.faces + 1)[:self.faces + 1]
+            self.soma += int(x.sum())
+            self.soma_quad += int((x * x).sum())
+            anterior = x if self.ultimo is None else np.concatenate(([self.ultimo], x))
+            self.soma_lag += int((anterior[:-1] * anterior[1:]).sum())
+            # média fica em X.5 nos dados pares (d4..d20): ninguém empata com ela
+            acima = anterior > (self.minimo + self.faces) / 2
+            self.trocas += int((acima[1:] != acima[:-1]).sum())
+            self.acima += int(acima[0 if self.ultimo is None else 1:].sum())
+            self.primeiro = int(x[0]) if self.primeiro is None else self.primeiro
+            self.ultimo = int(x[-1])
+            self.n += int(x.size)
+        self.segundos += time.perf_counter() - inicio
+
+    def resultado(self, alfa: float = ALFA_PADRAO) -> dict:
+        n, k = self.n, self.faces - self.minimo + 1
+        out = {"Dado": f"d{self.faces}", "Amostras": n, "Fora da faixa": self.fora}
+        if n < 2:
+            return {**out, "Passou": self.fora == 0, "ms": round(self.segundos * 1000, 1)}
+
+        # qui-quadrado contra a uniforme
+        esperado = n / k
+        obs = self.contagem[self.minimo:]
+        chi2 = float(((obs - esperado) ** 2).sum() / esperado)
+        p_chi2 = p_qui_quadrado(chi2, k - 1)
+
+        # correlação serial lag 1 (sob H0, r * sqrt(n) ~ N(0, 1))
+        media = self.soma / n
+        var = self.soma_quad / n - media ** 2
+        cov = (self.soma_lag - media * (2 * self.soma - self.primeiro - self.ultimo)) / (n - 1) + media ** 2
+        r1 = cov / var if var > 0 else 0.0
+        p_serial = p_normal(r1 * math.sqrt(n))
+
+        # runs acima/abaixo da média
+        n1, n2 = self.acima, n - self.acima
+        runs = self.trocas + 1
+        if n1 and n2:
+            esperado_runs = 2 * n1 * n2 / n + 1
+            var_runs = 2 * n1 * n2 * (2 * n1 * n2 - n) / (n * n * (n - 1))
+            z_runs = (runs - esperado_runs) / math.sqrt(var_runs)
+        else:
+            z_runs = float("inf")
+        p_runs = p_normal(z_runs)
+
+        passou = self.fora == 0 and min(p_chi2, p_serial, p_runs) >= alfa
+        return {
+            **out,
+            "χ²": round(chi2, 2), "gl": k - 1, "p χ²": round(p_chi2, 4),
+            "r1": round(r1, 5), "p serial": round(p_serial, 4),
+            "z runs": round(z_runs, 3), "p runs": round(p_runs, 4),
+            "Passou": passou,
+            "ms": round(self.segundos * 1000, 1),
+        }
+
+def auditar_backend(backend=None, n: int = 10_000_000, faces: tuple[int, ...] = FACES_PADRAO,
+                    lote: int = 1_000_000, alfa: float = ALFA_PADRAO) -> pd.DataFrame:
+    """
+    Puxa n resultados de cada dado do backend (em lotes de 'lote') e roda os testes.
+    backend: padrão é um BackendNumpy novo (não mexe na sequência de nenhuma sessão).
+    O "ms" conta a geração + os testes.
+    """
+    backend = BackendNumpy() if backend is None else backend
+    puxar = getattr(backend, "rolar_array", None) or (lambda f, v: np.asarray(backend.rolar(f, v)))
+    linhas = []
+    for f in faces:
+        teste = TesteDado(f)
+        inicio = time.perf_counter()
+        restante = n
+        while restante > 0:
+            m = min(lote, restante)
+            teste.adicionar(puxar(f, m))
+            restante -= m
+        linha = teste.resultado(alfa)
+        linha["ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        linhas.append(linha)
+    return pd.DataFrame(linhas)
+
+@lru_cache(maxsize=1024)
+def _dados_do_dano(habilidade: str, build: Build, crit: bool) -> tuple[tuple[int, int], ...]:
+    plano = nucleo.compilar_plano(habilidade, build)
+    return (plano.dano_crit if crit else plano.dano).dados
+
+def dados_da_rolagem(item: dict):
+    """
+    (faces, resultados) de cada dado que a rolagem arquivada mostra: os d20 (os dois, com vantagem) e,
+    se a invocação foi salva (replay_shoji), os dados do dano separados por tamanho.
+    """
+    r = normalizar_rolagem(item)
+    payload, inv = r["payload"], r["invocacao"]
+    d20s = payload.get("D20 (vantagem)") or ([payload["D20"]] if payload.get("D20") is not None else [])
+    if d20s:
+        yield 20, d20s
+    rols = payload.get("Rolagens")
+    if not rols or not inv or inv.get("tipo") != "habilidade":
+        return  # rolagem antiga: não dá pra saber de que tamanho é cada dado
+    try:
+        dados = _dados_do_dano(inv["nome"], Build(**inv["build"]), bool(payload.get("Crit")))
+    except (KeyError, TypeError, ValueError):
+        return
+    if sum(vezes for _, vezes in dados) != len(rols):
+        return
+    i = 0
+    for f, vezes in dados:  # a Expressao rola na ordem dos termos
+        yield f, rols[i:i + vezes]
+        i += vezes
+
+def auditar_rolagens(itens, alfa: float = ALFA_PADRAO, lote: int = 100_000) -> pd.DataFrame:
+    """Mesmos testes sobre rolagens reais (na ordem em que aconteceram), juntando lotes por tamanho de dado."""
+    testes, pendentes = {}, {}
+    for item in itens:
+        for f, valores in dados_da_rolagem(item):
+            buf = pendentes.setdefault(f, [])
+            buf.extend(valores)
+            if len(buf) >= lote:
+                testes.setdefault(f, TesteDado(f)).adicionar(np.array(buf))
+                buf.clear()
+    for f, buf in pendentes.items():
+        if buf:
+            testes.setdefault(f, TesteDado(f)).adicionar(np.array(buf))
+    return pd.DataFrame([testes[f].resultado(alfa) for f in sorted(testes)])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Testa se os dados são justos (qui-quadrado, correlação serial, runs).")
+    parser.add_argument("-n", type=int, default=10_000_000, help="amostras por dado (backend)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--faces", type=int, nargs="+", default=list(FACES_PADRAO))
+    parser.add_argument("--alfa", type=float, default=ALFA_PADRAO)
+    parser.add_argument("--banco", nargs="?", const=CAMINHO_BANCO, default=None,
+                        help=f"testa as rolagens salvas nesse SQLite (sem caminho: {CAMINHO_BANCO})")
+    parser.add_argument("--arquivos", nargs="+", default=None, help="testa rolagens de .jsonl / .parquet")
+    a = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if a.banco or a.arquivos:
+        if a.banco:
+            if not os.path.exists(a.banco):
+                parser.error(f"banco não encontrado: {a.banco}")
+            itens = BancoRolagens(a.banco).iterar(tamanho_lote=5000)
+        else:
+            itens = (item for caminho in a.arquivos
+                     for item in (ler_parquet(caminho) if caminho.endswith(".parquet") else ler_jsonl(caminho)))
+        df = auditar_rolagens(itens, a.alfa)
+        origem = a.banco or ", ".join(a.arquivos)
+    else:
+        df = auditar_backend(BackendNumpy(seed=a.seed), a.n, tuple(a.faces), alfa=a.alfa)
+        origem = f"backend ({a.n:,} por dado)"
+    segundos = time.perf_counter() - inicio
+
+    print(f"Auditoria dos dados: {origem}, alfa = {a.alfa}")
+    print(df.to_string(index=False) if not df.empty else "(nenhum dado)")
+    print(f"\nTotal: {segundos:.2f} s")
+    sys.exit(0 if df.empty or df["Passou"].all() else 1)
@@ -0,0 +1,170 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from resultado_shoji import como_dict
+
+# ---------------------------
+# Log persistente das rolagens (SQLite em WAL, inserts em lote)
+# ---------------------------
+# SHOJI_BANCO=rolagens.sqlite3 -> caminho do banco
+CAMINHO_BANCO = os.environ.get("SHOJI_BANCO", "rolagens.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rolagens (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    sessao     TEXT NOT NULL,
+    ts         REAL NOT NULL,
+    titulo     TEXT NOT NULL,
+    habilidade TEXT,
+    arma       TEXT,
+    payload    TEXT NOT NULL,
+    invocacao  TEXT
+);
+CREATE TABLE IF NOT EXISTS sessoes (
+    sessao         TEXT PRIMARY KEY,
+    ts             REAL NOT NULL,
+    seed           INTEGER NOT NULL,
+    tamanho_buffer INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_rolagens_sessao_ts ON rolagens (sessao, ts);
+CREATE INDEX IF NOT EXISTS idx_rolagens_ts ON rolagens (ts);
+CREATE INDEX IF NOT EXISTS idx_rolagens_habilidade ON rolagens (habilidade, ts);
+CREATE INDEX IF NOT EXISTS idx_rolagens_arma ON rolagens (arma, ts);
+"""
+
+class BancoRolagens:
+    """
+    Uma conexão por processo, compartilhada entre as sessões (com lock).
+    As rolagens ficam num buffer e vão pro banco a cada 'lote' itens ou 'intervalo' segundos;
+    qualquer consulta grava o que estiver pendente antes.
+    """
+
+    def __init__(self, caminho: str = CAMINHO_BANCO, lote: int = 20, intervalo: float = 5.0):
+        self.caminho = caminho
+        self.lote = lote
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._pendentes = []
+        self._ultimo_flush = time.monotonic()
+        self._con = sqlite3.connect(caminho, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.executescript(_SCHEMA)
+        colunas = {linha[1] for linha in self._con.execute("PRAGMA table_info(rolagens)")}
+        if "invocacao" not in colunas:  # banco criado antes do replay
+            self._con.execute("ALTER TABLE rolagens ADD COLUMN invocacao TEXT")
+        atexit.register(self.fechar)
+
+    def registrar(self, sessao: str, titulo: str, payload, ts: float | None = None,
+                  invocacao: dict | None = None):
+        """invocacao: o que gerou a rolagem (ver replay_shoji), pra dar pra refazer depois."""
+        payload = como_dict(payload)
+        linha = (
+            sessao,
+            time.time() if ts is None else ts,
+            titulo,
+            payload.get("Habilidade"),
+            payload.get("Arma"),
+            json.dumps(payload, ensure_ascii=False, default=str),
+            None if invocacao is None else json.dumps(invocacao, ensure_ascii=False),
+        )
+        with self._lock:
+            self._pendentes.append(linha)
+            if len(self._pendentes) >= self.lote or time.monotonic() - self._ultimo_flush >= self.intervalo:
+                self._flush()
+
+    def registrar_sessao(self, sessao: str, seed: int, tamanho_buffer: int | None = None):
+        """Guarda a semente dos dados da sessão (na hora, sem esperar o lote; a primeira gravada vale)."""
+        with self._lock, self._con:
+            self._con.execute(
+                "INSERT OR IGNORE INTO sessoes (sessao, ts, seed, tamanho_buffer) VALUES (?, ?, ?, ?)",
+                (sessao, time.time(), int(seed), tamanho_buffer),
+            )
+
+    def sessao(self, sessao: str) -> dict | None:
+        with self._lock:
+            linha = self._con.execute(
+                "SELECT ts, seed, tamanho_buffer FROM sessoes WHERE sessao = ?", (sessao,)).fetchone()
+        if linha is None:
+            return None
+        ts, seed, tamanho_buffer = linha
+        return {"sessao": sessao, "ts": ts, "seed": seed, "tamanho_buffer": tamanho_buffer}
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._ultimo_flush = time.monotonic()
+        if not self._pendentes:
+            return
+        with self._con:
+            self._con.executemany(
+                "INSERT INTO rolagens (sessao, ts, titulo, habilidade, arma, payload, invocacao) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._pendentes,
+            )
+        self._pendentes = []
+
+    def _filtros(self, sessao, habilidade, arma):
+        where, args = [], []
+        for coluna, valor in (("sessao", sessao), ("habilidade", habilidade), ("arma", arma)):
+            if valor is not None:
+                where.append(f"{coluna} = ?")
+                args.append(valor)
+        return (" WHERE " + " AND ".join(where) if where else ""), args
+
+    def pagina(self, pagina: int = 0, por_pagina: int = 10, sessao: str | None = None,
+               habilidade: str | None = None, arma: str | None = None) -> list[dict]:
+        """Rolagens da mais nova pra mais antiga, 'por_pagina' por vez (pagina começa em 0)."""
+        where, args = self._filtros(sessao, habilidade, arma)
+        with self._lock:
+            self._flush()
+            cur = self._con.execute(
+                f"SELECT id, sessao, ts, titulo, payload FROM rolagens{where} ORDER BY ts DESC LIMIT ? OFFSET ?",
+                (*args, int(por_pagina), int(pagina) * int(por_pagina)),
+            )
+            linhas = cur.fetchall()
+        return [
+            {"id": i, "sessao": s, "ts": ts, "msg": titulo, "payload": json.loads(p)}
+            for i, s, ts, titulo, p in linhas
+        ]
+
+    def iterar(self, sessao: str | None = None, habilidade: str | None = None, arma: str | None = None,
+               tamanho_lote: int = 1000):
+        """
+        Todas as rolagens (filtradas), da mais antiga pra mais nova, buscando 'tamanho_lote' por vez
+        (keyset pelo id): memória constante e o lock só fica preso durante cada busca.
+        """
+        where, args = self._filtros(sessao, habilidade, arma)
+        where = f"{where} AND id > ?" if where else " WHERE id > ?"
+        ultimo_id = 0
+        while True:
+            with self._lock:
+                self._flush()
+                linhas = self._con.execute(
+                    f"SELECT id, sessao, ts, titulo, payload, invocacao FROM rolagens{where} ORDER BY id LIMIT ?",
+                    (*args, ultimo_id, int(tamanho_lote)),
+                ).fetchall()
+            for i, s, ts, titulo, p, inv in linhas:
+                yield {"id": i, "sessao": s, "ts": ts, "msg": titulo, "payload": json.loads(p),
+                       "invocacao": None if inv is None else json.loads(inv)}
+            if len(linhas) < tamanho_lote:
+                return
+            ultimo_id = linhas[-1][0]
+
+    def contar(self, sessao: str | None = None, habilidade: str | None = None, arma: str | None = None) -> int:
+        where, args = self._filtros(sessao, habilidade, arma)
+        with self._lock:
+            self._flush()
+            return self._con.execute(f"SELECT COUNT(*) FROM rolagens{where}", args).fetchone()[0]
+
+    def fechar(self):
+        with self._lock:
+            if self._con is None:
+                return
+            self._flush()
+            self._con.close()
+            self._con = None
@@ -0,0 +1,59 @@
+import random
+import secrets
+import threading
+from contextvars import ContextVar
+import numpy as np
+
+# ---------------------------
+# Backends de dados
+# ---------------------------
+# dado() / dado_cura_aprimorada() pedem os números pro backend ativo (ver usar_backend).
+#   - BackendNumpy: buffer pré-sorteado por tipo de dado (Generator do NumPy), recarrega em bloco,
+#     aceita semente -> mesma semente + mesma sequência de rolagens = mesmos resultados
+#   - BackendRandom: o random do Python, um randint por dado (como era antes)
+
+class BackendRandom:
+    def __init__(self, seed: int | None = None):
+        self.seed = seed
+        self._random = random.Random(seed)
+
+    def rolar(self, faces: int, vezes: int = 1, minimo: int = 1) -> list[int]:
+        return [self._random.randint(minimo, faces) for _ in range(vezes)]
+
+class BackendNumpy:
+    def __init__(self, seed: int | None = None, tamanho_buffer: int = 4096):
+        self.seed = secrets.randbits(32) if seed is None else int(seed)
+        self.tamanho_buffer = tamanho_buffer
+        self.rng = np.random.default_rng(self.seed)
+        self._buffers = {}  # (minimo, faces) -> [array, posição]
+        self._lock = threading.Lock()
+
+    def rolar(self, faces: int, vezes: int = 1, minimo: int = 1) -> list[int]:
+        return self._proximos(faces, vezes, minimo).tolist()
+
+    def rolar_array(self, faces: int, vezes: int = 1, minimo: int = 1) -> np.ndarray:
+        """Mesmo que rolar(), mas devolve um array int16 (sem virar lista): pra puxar milhões de uma vez."""
+        return self._proximos(faces, vezes, minimo).copy()
+
+    def _proximos(self, faces: int, vezes: int, minimo: int) -> np.ndarray:
+        with self._lock:
+            buf = self._buffers.get((minimo, faces))
+            if buf is None or buf[1] + vezes > len(buf[0]):
+                # recarrega em bloco, mantendo o que sobrou do buffer anterior (ordem não muda)
+                sobra = buf[0][buf[1]:] if buf is not None else np.empty(0, dtype=np.int16)
+                novos = self.rng.integers(minimo, faces + 1, size=max(self.tamanho_buffer, vezes), dtype=np.int16)
+                buf = [np.concatenate([sobra, novos]), 0]
+                self._buffers[(minimo, faces)] = buf
+            pos = buf[1]
+            buf[1] = pos + vezes
+            return buf[0][pos:pos + vezes]
+
+_backend_padrao = BackendNumpy()
+_backend_atual = ContextVar("backend_dados", default=_backend_padrao)
+
+def usar_backend(backend):
+    """Ativa o backend no contexto atual (na ficha: uma vez por rerun, com o backend da sessão)."""
+    _backend_atual.set(backend)
+
+def backend_atual():
+    return _backend_atual.get()
@@ -0,0 +1,112 @@
+from ataques_shoji import mod, adicional_kukan
+import nucleo_shoji as nucleo
+from nucleo_shoji import Build, calcula_maestria
+from pericias_shoji import aplicar_kukan, calcular_pericias_base
+
+# ---------------------------
+# Grafo de atributos derivados (recalcula só o que teve entrada mudada)
+# ---------------------------
+# Entradas (personagem, arma, postura, guarda, ...) entram com definir(); cada regra declara de quem
+# depende. Ler um nó puxa as dependências e só recalcula se a versão de alguma delas mudou;
+# se o valor recalculado sair igual ao anterior a versão não muda e quem vem depois nem é tocado.
+# Ex.: marcar "Erguer Guarda" recalcula mod_rd_guarda -> modificadores_rd e mais nada.
+
+_NADA = object()
+
+def _iguais(a, b) -> bool:
+    if a is b:
+        return True
+    if a is _NADA or b is _NADA:
+        return False
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError, NotImplementedError):  # DataFrame, array...: compara por identidade
+        return False
+
+class GrafoDerivados:
+    def __init__(self):
+        self._regras = {}   # nome -> (função, dependências)
+        self._valores = {}
+        self._versoes = {}  # nome -> versão (sobe quando o valor muda)
+        self._base = {}     # regra -> versões das dependências no último cálculo
+        self.recalculados = []  # regras recalculadas desde o último limpar
+
+    def regra(self, nome: str, *deps: str):
+        """Decorator: registra 'nome' = função(*valores das deps)."""
+        def registrar(func):
+            self._regras[nome] = (func, deps)
+            return func
+        return registrar
+
+    def definir(self, **entradas):
+        for nome, valor in entradas.items():
+            if nome in self._regras:
+                raise ValueError(f"{nome} é derivado, não dá pra definir")
+            self._guardar(nome, valor)
+
+    def _guardar(self, nome: str, valor):
+        if _iguais(self._valores.get(nome, _NADA), valor):
+            return
+        self._valores[nome] = valor
+        self._versoes[nome] = self._versoes.get(nome, 0) + 1
+
+    def __getitem__(self, nome: str):
+        if nome not in self._regras:
+            if nome not in self._valores:
+                raise KeyError(f"Entrada não definida: {nome}")
+            return self._valores[nome]
+        func, deps = self._regras[nome]
+        args = [self[d] for d in deps]  # puxa (e atualiza) as dependências primeiro
+        base = tuple(self._versoes[d] for d in deps)
+        if self._base.get(nome) != base:
+            self._guardar(nome, func(*args))
+            self._base[nome] = base
+            self.recalculados.append(nome)
+        return self._valores[nome]
+
+    def limpar_recalculados(self):
+        self.recalculados = []
+
+def _pericias_base(caminho, assinatura_csv, nivel, maestria, atributos, tabela):
+    # assinatura_csv só serve de chave pra quem põe isso em cache
+    return calcular_pericias_base(caminho, nivel, maestria, atributos, tabela)
+
+def grafo_ficha(carregar_pericias_base=_pericias_base) -> GrafoDerivados:
+    """
+    Grafo da ficha. Entradas: personagem, assinatura_pericias (mtime/tamanho do csv), arma, postura,
+    kukan, golpe_descendente, guarda, ca_outros, rd_outros.
+    carregar_pericias_base: troque por uma versão em cache compartilhado (a ficha usa st.cache_resource).
+    """
+    g = GrafoDerivados()
+
+    # números da ficha
+    g.regra("nivel", "personagem")(lambda p: p.nivel)
+    g.regra("atributos", "personagem")(lambda p: p.atributos)
+    g.regra("CA", "personagem")(lambda p: p.CA)
+    g.regra("maestria", "nivel")(calcula_maestria)
+    g.regra("mods_atributos", "atributos")(
+        lambda atr: dict(zip(("For", "Des", "Con", "Int", "Sab", "Car"), (mod(a) for a in atr))))
+    g.regra("cd_do_tr", "maestria", "mods_atributos")(lambda m, mods: 10 + m + mods["Int"] + 1)
+
+    # CA (mesmas regras do nucleo_shoji, só com o que cada uma usa)
+    g.regra("mod_ca_golpe_descendente", "golpe_descendente", "nivel")(
+        lambda gd, nivel: nucleo.mod_ca_golpe_descendente(Build('', golpe_descendente=gd, nivel=nivel)))
+    g.regra("mod_ca_postura", "postura")(lambda postura: nucleo.mod_ca_postura(Build('', postura=postura)))
+    g.regra("modificadores_ca", "mod_ca_golpe_descendente", "mod_ca_postura", "ca_outros")(
+        lambda gd, postura, outros: gd + postura + outros)
+
+    # RD
+    g.regra("mod_rd_adagas", "arma", "nivel")(lambda arma, nivel: nucleo.mod_rd_adagas(Build(arma, nivel=nivel)))
+    g.regra("mod_rd_guarda", "guarda", "arma", "nivel", "kukan")(
+        lambda guarda, arma, nivel, kukan: nucleo.mod_rd_guarda(Build(arma, guarda=guarda, nivel=nivel, kukan=kukan)))
+    g.regra("modificadores_rd", "mod_rd_adagas", "mod_rd_guarda", "rd_outros")(
+        lambda adagas, guarda, outros: adagas + guarda + outros)
+
+    # perícias: a parte pesada (csv + colunas) não depende do Kukan; o Kukan só soma uma coluna
+    g.regra("per_kukan", "kukan")(lambda kukan: adicional_kukan.get(kukan, 0))
+    g.regra("pericias_base", "personagem", "assinatura_pericias", "nivel", "maestria", "atributos")(
+        lambda p, assinatura, nivel, maestria, atributos:
+            carregar_pericias_base(p.csv_pericias, assinatura, nivel, maestria, atributos, p.pericias))
+    g.regra("pericias", "pericias_base", "per_kukan", "personagem")(
+        lambda base, per_kukan, p: aplicar_kukan(base, per_kukan, p.pericias))
+    return g
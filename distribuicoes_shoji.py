@@ -0,0 +1,81 @@
+from dataclasses import dataclass
+from functools import lru_cache
+import numpy as np
+from nucleo_shoji import PlanoAtaque
+
+# ---------------------------
+# Distribuição exata de dano (convolução das PMFs dos dados)
+# ---------------------------
+# Nada de sortear: a PMF de Nd<faces> sai convoluindo a PMF de 1 dado N vezes.
+# Tudo fica em cache, então média/variância/percentis saem na hora pra ficha.
+
+def _mesmo_tamanho(*pmfs: np.ndarray) -> list[np.ndarray]:
+    n = max(len(p) for p in pmfs)
+    return [np.pad(p, (0, n - len(p))) for p in pmfs]
+
+@dataclass(frozen=True)
+class DistribuicaoDano:
+    """
+    Distribuição de dano de um ataque. Os arrays são indexados pelo dano:
+      - normal: P(dano = i e acertou sem crit)
+      - crit:   P(dano = i e critou)
+      - pmf:    normal + crit + P(errou) no dano 0
+    """
+    normal: np.ndarray
+    crit: np.ndarray
+    pmf: np.ndarray
+    p_acerto: float
+    p_crit: float
+
+    def media(self) -> float:
+        return float(np.dot(np.arange(len(self.pmf)), self.pmf))
+
+    def variancia(self) -> float:
+        x = np.arange(len(self.pmf))
+        return float(np.dot(x * x, self.pmf) - self.media() ** 2)
+
+    def cdf(self) -> np.ndarray:
+        return np.cumsum(self.pmf)
+
+    def percentil(self, p: float) -> int:
+        """Menor dano d com P(dano <= d) >= p (p entre 0 e 1)."""
+        return int(np.searchsorted(self.cdf(), p - 1e-12))
+
+    def resumo(self) -> dict:
+        return {
+            "Dano médio": round(self.media(), 2),
+            "Desvio": round(self.variancia() ** 0.5, 2),
+            "P10": self.percentil(0.10),
+            "Mediana": self.percentil(0.50),
+            "P90": self.percentil(0.90),
+            "Chance de acerto": round(self.p_acerto, 4),
+            "Chance de crit": round(self.p_crit, 4),
+        }
+
+def chance_crit(crit_threshold):
+    """P(d20 >= crit_threshold). Aceita escalar ou array."""
+    return (21 - np.clip(crit_threshold, 1, 21)) / 20
+
+def chance_acerto(acerto, crit_threshold, ca_alvo):
+    """P(d20 + acerto >= ca_alvo ou crit). Aceita escalar ou array (broadcast)."""
+    # d20 mínimo pra acertar, limitado entre 1 e 21 (21 = só acerta no crit)
+    minimo = np.clip(np.asarray(ca_alvo) - acerto, 1, 21)
+    return np.maximum((21 - minimo) / 20, chance_crit(crit_threshold))
+
+@lru_cache(maxsize=256)
+def distribuicao_plano(plano: PlanoAtaque, ca_alvo: int | None = None) -> DistribuicaoDano:
+    """
+    Distribuição exata de um PlanoAtaque já compilado (nucleo_shoji), com todos os modificadores:
+    Golpe Pessoal, vantagem (2d20, fica o maior), habilidade... O plano é a chave do cache.
+    """
+    vezes = 2 if plano.vantagem else 1
+    p_crit = float(1 - (1 - chance_crit(plano.crit_threshold)) ** vezes)
+    p_um = 1.0 if ca_alvo is None else float(chance_acerto(plano.acerto, plano.crit_threshold, ca_alvo))
+    p_acerto = 1 - (1 - p_um) ** vezes
+
+    normal, crit = _mesmo_tamanho(plano.dano.pmf() * (p_acerto - p_crit), plano.dano_crit.pmf() * p_crit)
+    pmf = normal + crit
+    pmf[0] += 1.0 - p_acerto
+    for arr in (normal, crit, pmf):
+        arr.setflags(write=False)
+    return DistribuicaoDano(normal=normal, crit=crit, pmf=pmf, p_acerto=p_acerto, p_crit=p_crit)
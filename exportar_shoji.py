@@ -0,0 +1,133 @@
+import argparse
+import csv
+import json
+import os
+from itertools import islice
+from banco_shoji import CAMINHO_BANCO, BancoRolagens
+
+# ---------------------------
+# Exportação do histórico salvo (CSV / JSONL / Parquet, em streaming)
+# ---------------------------
+# Lê o SQLite em lotes (BancoRolagens.iterar) e escreve cada lote assim que chega:
+# a memória fica no tamanho de um lote, não importa o tamanho da campanha.
+# O payload vira colunas tipadas; o json original vai junto na coluna "payload" (e a invocação, em "invocacao").
+#   python exportar_shoji.py campanha.parquet [--sessao ...] [--banco rolagens.sqlite3]
+#   pd.read_parquet("campanha.parquet")
+
+# coluna -> (tipo, chaves do payload em ordem de preferência). Sem chaves: sai do item ou da invocação.
+COLUNAS = {
+    "id": ("int", ()),
+    "sessao": ("str", ()),
+    "ts": ("float", ()),
+    "titulo": ("str", ()),
+    "habilidade": ("str", ("Habilidade",)),
+    "d20": ("int", ("D20",)),
+    "ataque_total": ("int", ("Rolagem de Ataque", "Ataque")),
+    "dano": ("int", ("Dano",)),
+    "crit": ("bool", ("Crit",)),
+    "arma": ("str", ("Arma",)),
+    "postura": ("str", ("Postura",)),
+    "estilo": ("str", ("Estilo Oculto",)),
+    "kukan": ("str", ()),                           # nome, do Build da invocação (como Build.kukan)
+    "kukan_bonus": ("int", ("Kukan no Kyoka",)),    # o bônus que a rolagem mostrou
+    "payload": ("str", ()),
+    "invocacao": ("str", ()),
+}
+
+FORMATOS = ("csv", "jsonl", "parquet")
+
+def _converter(valor, tipo: str):
+    if valor is None:
+        return None
+    try:
+        if tipo == "int":
+            return int(valor)
+        if tipo == "float":
+            return float(valor)
+        if tipo == "bool":
+            return bool(valor)
+    except (TypeError, ValueError):
+        return None
+    return str(valor)
+
+def achatar(item: dict) -> dict:
+    """Rolagem do banco ({id, sessao, ts, msg, payload}) -> linha com as COLUNAS."""
+    payload = item["payload"]
+    linha = {"id": item["id"], "sessao": item["sessao"], "ts": item["ts"], "titulo": item["msg"]}
+    for coluna, (tipo, chaves) in COLUNAS.items():
+        if chaves:
+            valor = next((payload[k] for k in chaves if payload.get(k) is not None), None)
+            linha[coluna] = _converter(valor, tipo)
+    linha["payload"] = json.dumps(payload, ensure_ascii=False, default=str)
+    invocacao = item.get("invocacao")  # o que gerou a rolagem (replay_shoji), se foi salvo
+    build = (invocacao or {}).get("build") or {}
+    linha["kukan"] = _converter(build.get("kukan"), "str")  # rolagem antiga, sem invocação: só o bônus
+    linha["invocacao"] = None if invocacao is None else json.dumps(invocacao, ensure_ascii=False)
+    return linha
+
+def _lotes(linhas, tamanho: int):
+    it = iter(linhas)
+    while lote := list(islice(it, tamanho)):
+        yield lote
+
+def _escrever_csv(lotes, caminho: str):
+    with open(caminho, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(COLUNAS))
+        writer.writeheader()
+        for lote in lotes:
+            writer.writerows(lote)
+
+def _escrever_jsonl(lotes, caminho: str):
+    with open(caminho, "w", encoding="utf-8") as f:
+        for lote in lotes:
+            f.writelines(json.dumps(linha, ensure_ascii=False) + "\n" for linha in lote)
+
+def _escrever_parquet(lotes, caminho: str):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Exportar em Parquet precisa do pyarrow (pip install pyarrow)") from e
+    tipos = {"int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(), "str": pa.string()}
+    schema = pa.schema([(coluna, tipos[tipo]) for coluna, (tipo, _) in COLUNAS.items()])
+    with pq.ParquetWriter(caminho, schema) as writer:
+        for lote in lotes:
+            # um row group por lote
+            writer.write_table(pa.Table.from_pylist(lote, schema=schema))
+
+def exportar_rolagens(banco: BancoRolagens, caminho: str, formato: str | None = None,
+                      sessao: str | None = None, tamanho_lote: int = 5000) -> int:
+    """
+    Exporta o histórico salvo (uma sessão ou todas) pra 'caminho'.
+    formato: "csv", "jsonl" ou "parquet" (padrão: pela extensão do arquivo). Retorna quantas linhas saíram.
+    """
+    formato = (formato or os.path.splitext(caminho)[1].lstrip(".")).lower()
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato!r} (use {', '.join(FORMATOS)})")
+
+    total = 0
+    def contando(lotes):
+        nonlocal total
+        for lote in lotes:
+            total += len(lote)
+            yield lote
+
+    linhas = (achatar(item) for item in banco.iterar(sessao=sessao, tamanho_lote=tamanho_lote))
+    escrever = {"csv": _escrever_csv, "jsonl": _escrever_jsonl, "parquet": _escrever_parquet}[formato]
+    escrever(contando(_lotes(linhas, tamanho_lote)), caminho)
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta o histórico de rolagens salvo no SQLite.")
+    parser.add_argument("saida", help="arquivo de saída (.csv, .jsonl ou .parquet)")
+    parser.add_argument("--formato", choices=FORMATOS, default=None)
+    parser.add_argument("--sessao", default=None, help="só as rolagens dessa sessão")
+    parser.add_argument("--banco", default=CAMINHO_BANCO)
+    parser.add_argument("--lote", type=int, default=5000)
+    a = parser.parse_args()
+
+    if not os.path.exists(a.banco):
+        parser.error(f"banco não encontrado: {a.banco}")
+    banco = BancoRolagens(a.banco)
+    n = exportar_rolagens(banco, a.saida, a.formato, a.sessao, a.lote)
+    print(f"{n} rolagens exportadas para {a.saida}")
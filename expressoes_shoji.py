@@ -0,0 +1,126 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+import numpy as np
+from dados_shoji import backend_atual
+
+# ---------------------------
+# Expressões de dados ("3d8+12", "crit 10d8+12", "1d20+18 crit>=19")
+# ---------------------------
+# compilar() faz o parse uma vez só (cache por texto) e devolve uma Expressao com três jeitos de avaliar:
+#   - rolar():         uma rolagem no backend ativo (dados_shoji), com os dados que saíram
+#   - rolar_lote(n):   n rolagens de uma vez com um Generator do NumPy
+#   - pmf():           distribuição exata da soma (convolução, também em cache)
+# Sintaxe: termos NdF / dF / número ligados por + ou -, "crit" na frente marca a expressão do
+# crítico e "crit>=N" no fim diz a partir de qual d20 é crítico (só faz sentido na rolagem de ataque).
+
+_TERMO = re.compile(r"([+-]?)\s*(?:(\d*)d(\d+)|(\d+))")
+_CRIT = re.compile(r"crit\s*>=\s*(\d+)$")
+
+@dataclass(frozen=True)
+class Expressao:
+    texto: str
+    dados: tuple[tuple[int, int], ...]  # (faces, quantidade), somados
+    bonus: int = 0
+    crit_threshold: int | None = None
+    critico: bool = False               # "crit" na frente: expressão do dano no crítico
+
+    @property
+    def minimo(self) -> int:
+        return sum(vezes for _, vezes in self.dados) + self.bonus
+
+    @property
+    def maximo(self) -> int:
+        return sum(faces * vezes for faces, vezes in self.dados) + self.bonus
+
+    def media(self) -> float:
+        return sum(vezes * (faces + 1) / 2 for faces, vezes in self.dados) + self.bonus
+
+    def rolar(self) -> tuple[int, list[int]]:
+        """(total, dados que saíram). O primeiro dado é o d20 numa rolagem de ataque."""
+        backend = backend_atual()
+        rols = []
+        for faces, vezes in self.dados:
+            rols.extend(backend.rolar(faces, vezes))
+        return sum(rols) + self.bonus, rols
+
+    def rolar_lote(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        """Total de n rolagens (array de tamanho n)."""
+        total = np.full(n, self.bonus, dtype=np.int32)
+        for faces, vezes in self.dados:
+            total += soma_dados_lote(faces, vezes, n, rng)
+        return total
+
+    def pmf(self) -> np.ndarray:
+        """PMF do total, indexada pelo valor (pmf[v] = P(total = v))."""
+        return _pmf_expressao(self.dados, self.bonus)
+
+def soma_dados_lote(faces: int, vezes: int, n: int, rng: np.random.Generator) -> np.ndarray:
+    """Rola 'vezes' dados de 'faces' para cada uma das n linhas e devolve a soma por linha."""
+    if n == 0 or vezes == 0:
+        return np.zeros(n, dtype=np.int32)
+    rols = rng.integers(1, faces + 1, size=(n, vezes), dtype=np.int16)
+    return rols.sum(axis=1, dtype=np.int32)
+
+@lru_cache(maxsize=None)
+def pmf_dados(faces: int, vezes: int) -> np.ndarray:
+    """PMF da soma de 'vezes' dados de 'faces'. O índice é o valor da soma (pmf[0] = P(soma=0))."""
+    pmf = np.array([1.0])
+    if vezes > 0:
+        um_dado = np.full(faces + 1, 1.0 / faces)
+        um_dado[0] = 0.0
+        for _ in range(vezes):
+            pmf = np.convolve(pmf, um_dado)
+    pmf.setflags(write=False)  # vai pro cache, ninguém mexe
+    return pmf
+
+@lru_cache(maxsize=256)
+def _pmf_expressao(dados: tuple[tuple[int, int], ...], bonus: int) -> np.ndarray:
+    pmf = np.array([1.0])
+    for faces, vezes in dados:
+        pmf = np.convolve(pmf, pmf_dados(faces, vezes))
+    if bonus < 0:
+        if -bonus > np.flatnonzero(pmf)[0]:
+            raise ValueError("PMF com total negativo: o bônus negativo passa do mínimo dos dados")
+        pmf = pmf[-bonus:]
+    else:
+        pmf = np.concatenate([np.zeros(bonus), pmf])
+    pmf.setflags(write=False)
+    return pmf
+
+@lru_cache(maxsize=None)
+def compilar(texto: str) -> Expressao:
+    """Parse de uma expressão de dados (em cache: cada texto é compilado uma vez só)."""
+    resto = " ".join(texto.lower().split())
+    critico = resto.startswith("crit ")
+    if critico:
+        resto = resto[5:]
+    crit_threshold = None
+    m = _CRIT.search(resto)
+    if m:
+        crit_threshold = int(m.group(1))
+        resto = resto[:m.start()].strip()
+
+    if not resto:
+        raise ValueError(f"Expressão de dados vazia: {texto!r}")
+
+    dados = {}
+    bonus = 0
+    pos = 0
+    while pos < len(resto):
+        m = _TERMO.match(resto, pos)
+        if not m or (pos > 0 and not m.group(1)):
+            raise ValueError(f"Expressão de dados inválida: {texto!r}")
+        sinal, vezes, faces, numero = m.groups()
+        if numero is not None:
+            bonus += -int(numero) if sinal == "-" else int(numero)
+        else:
+            if sinal == "-":
+                raise ValueError(f"Subtrair dados não é suportado: {texto!r}")
+            if int(faces) < 1:
+                raise ValueError(f"Dado sem faces: {texto!r}")
+            dados[int(faces)] = dados.get(int(faces), 0) + int(vezes or 1)
+        pos = m.end()
+        while pos < len(resto) and resto[pos] == " ":
+            pos += 1
+    return Expressao(texto, tuple(dados.items()), bonus, crit_threshold, critico)
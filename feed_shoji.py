@@ -0,0 +1,52 @@
+import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+from resultado_shoji import como_dict
+
+# ---------------------------
+# Feed da mesa (todas as rolagens de todas as sessões, ao vivo)
+# ---------------------------
+# Um feed por processo: o add_log de cada sessão publica aqui, e cada sessão lê só o que veio
+# depois do último id que ela já viu (cursor), num fragment com run_every.
+# O SQLite continua sendo o histórico completo; o feed guarda só as últimas 'tamanho' rolagens
+# e não espera o flush em lote do banco.
+#   SHOJI_FEED_MAX=200        -> quantas rolagens o feed segura
+#   SHOJI_FEED_INTERVALO=2    -> de quantos em quantos segundos a sessão busca novidades
+TAMANHO_FEED = int(os.environ.get("SHOJI_FEED_MAX", 200))
+INTERVALO_FEED = float(os.environ.get("SHOJI_FEED_INTERVALO", 2))
+
+class FeedMesa:
+    """Buffer circular com ids crescentes e contíguos (o cursor vira um índice direto)."""
+
+    def __init__(self, tamanho: int = TAMANHO_FEED):
+        self._itens = deque(maxlen=max(int(tamanho), 1))
+        self._proximo_id = 1
+        self._lock = threading.Lock()
+
+    def publicar(self, autor: str, msg: str, payload) -> int:
+        with self._lock:
+            item = {
+                "id": self._proximo_id,
+                "ts": time.time(),
+                "autor": autor,
+                "msg": msg,
+                "payload": como_dict(payload),
+            }
+            self._itens.append(item)
+            self._proximo_id += 1
+            return item["id"]
+
+    def ultimo_id(self) -> int:
+        return self._proximo_id - 1
+
+    def desde(self, ultimo_id: int = 0, limite: int | None = None) -> list[dict]:
+        """Itens com id > ultimo_id, do mais antigo pro mais novo (no máximo os 'limite' mais novos)."""
+        with self._lock:
+            if not self._itens:
+                return []
+            inicio = max(ultimo_id + 1 - self._itens[0]["id"], 0)
+            if limite is not None:
+                inicio = max(inicio, len(self._itens) - limite)
+            return list(islice(self._itens, inicio, None))
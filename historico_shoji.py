@@ -0,0 +1,212 @@
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+import numpy as np
+from resultado_shoji import Resultado, como_dict
+
+# ---------------------------
+# Histórico de rolagens (buffer circular em arrays + spill opcional em disco)
+# ---------------------------
+# Tamanho do buffer em memória e pasta do spill vêm do ambiente:
+#   SHOJI_HISTORICO_MAX=50         -> quantas rolagens ficam na sessão
+#   SHOJI_HISTORICO_SPILL_DIR=...  -> se definido, as mais antigas vão pra um .jsonl lá
+# Nada de um dict por rolagem: os números e os dados ficam em arrays numpy de largura fixa (uma linha
+# por rolagem, ~65 bytes) e o que se repete vira código numa tabela de internamento: o título, os
+# textos da habilidade (habilidade, alcance, descrições, efeito) como uma tupla só, e os extras
+# (arma/postura/estilo...) também como uma tupla só. Lista nos extras (os d20 da vantagem) muda a cada
+# rolagem: os valores vão pro array de dados, depois das rolagens, e a tupla só guarda o tamanho.
+# O Resultado só é remontado quando alguém lê.
+# A tabela é refeita só com os códigos das linhas vivas quando passa do dobro do que elas podem usar,
+# então a memória fica limitada pelo tamanho do buffer mesmo numa sessão longa.
+TAMANHO_HISTORICO = int(os.environ.get("SHOJI_HISTORICO_MAX", 50))
+PASTA_SPILL = os.environ.get("SHOJI_HISTORICO_SPILL_DIR") or None
+
+_VAZIO = np.iinfo(np.int32).min  # "None" nos arrays de inteiros
+MAX_DADOS = 32    # dados (+ listas dos extras) por rolagem que cabem no array (mais: guarda o payload inteiro)
+MAX_CODIGOS = np.iinfo(np.int16).max  # códigos de internamento em int16
+
+# campos de texto do Resultado que vão juntos num código só
+_TEXTOS = ("habilidade", "alcance", "descricao", "descricao_extra", "efeito")
+_CODIGOS_POR_LINHA = 3  # título, textos, extras
+
+class _Internador:
+    """valor -> código pequeno (e volta). Cada valor distinto é guardado uma vez só."""
+
+    def __init__(self):
+        self._valores = []
+        self._codigos = {}
+
+    def codigo(self, valor) -> int:
+        if valor is None:
+            return -1
+        c = self._codigos.get(valor)
+        if c is None:
+            if len(self._valores) >= MAX_CODIGOS:
+                raise OverflowError("tabela de internamento cheia")
+            c = self._codigos[valor] = len(self._valores)
+            self._valores.append(valor)
+        return c
+
+    def valor(self, codigo: int):
+        return None if codigo < 0 else self._valores[codigo]
+
+    def __len__(self):
+        return len(self._valores)
+
+@dataclass(frozen=True)
+class _Lista:
+    """No lugar de uma lista dos extras: quantos valores dela estão no array de dados."""
+    tamanho: int
+
+def _inteiro(valor) -> int:
+    return _VAZIO if valor is None else int(valor)
+
+def _opcional(valor) -> int | None:
+    return None if valor == _VAZIO else int(valor)
+
+class HistoricoRolagens:
+    """
+    Guarda as últimas 'tamanho' rolagens (append O(1), a mais antiga é sobrescrita).
+    Se 'arquivo_spill' for passado, o que sai do buffer é gravado lá (uma linha JSON por item).
+    Os itens lidos têm o formato de sempre: {"msg", "payload", "ts" ("HH:MM:SS")}.
+    """
+
+    def __init__(self, tamanho: int = TAMANHO_HISTORICO, arquivo_spill: str | None = None):
+        self.tamanho = n = max(int(tamanho), 1)
+        self.arquivo_spill = arquivo_spill
+        self._tabela = _Internador()  # títulos, tuplas de textos e tuplas de extras
+        self._codigos = np.full((n, _CODIGOS_POR_LINHA), -1, dtype=np.int16)  # título, textos, extras
+        self._ts = np.zeros(n, dtype=np.uint32)  # segundos (a leitura só mostra HH:MM:SS)
+        self._numeros = np.full((n, 4), _VAZIO, dtype=np.int32)  # d20, ataque_total, dano, cd_tr
+        self._crit = np.zeros(n, dtype=bool)
+        self._dados = np.zeros((n, MAX_DADOS), dtype=np.uint8)  # faces até d255
+        self._qtd_dados = np.zeros(n, dtype=np.uint8)
+        self._soltos = {}  # slot -> (msg, payload) que não coube nos arrays (dict solto, metadado estranho)
+        self._total = 0    # quantas rolagens já entraram (o slot é total % tamanho)
+        # códigos que as linhas vivas podem usar no máximo; passando do dobro disso, refaz a tabela
+        self._limite_tabela = min(2 * n * _CODIGOS_POR_LINHA, MAX_CODIGOS)
+
+    def adicionar(self, msg: str, payload, ts: float | None = None):
+        slot = self._total % self.tamanho
+        if self._total >= self.tamanho:
+            if self.arquivo_spill:
+                self._spill(self._item(slot))
+            self._soltos.pop(slot, None)
+            self._codigos[slot] = -1  # a linha que sai não segura mais nenhum código
+        self._total += 1
+        if len(self._tabela) > self._limite_tabela - _CODIGOS_POR_LINHA:
+            self._reconstruir_tabela()
+
+        self._ts[slot] = int(time.time() if ts is None else ts)
+        if not self._compactar(slot, msg, payload):
+            self._soltos[slot] = (msg, payload)
+
+    def _compactar(self, slot: int, msg: str, payload) -> bool:
+        """Passa a rolagem pros arrays. False se não couber (aí ela fica inteira em _soltos)."""
+        if not isinstance(payload, Resultado):
+            return False
+        listas = []
+        extras = []
+        for k, v in payload.extras.items():
+            if isinstance(v, list):
+                listas.extend(v)
+                v = _Lista(len(v))
+            extras.append((k, v))
+        if len(payload.rolagens) + len(listas) > MAX_DADOS:
+            return False
+        # converte tudo antes de escrever qualquer array: se algo não couber, o slot não fica pela metade
+        try:
+            codigos = [self._tabela.codigo(msg),
+                       self._tabela.codigo(tuple(getattr(payload, c) for c in _TEXTOS)),
+                       self._tabela.codigo(tuple(extras))]
+            dados = np.array([*payload.rolagens, *listas], dtype=np.uint8)
+            numeros = np.array([_inteiro(payload.d20), _inteiro(payload.ataque_total),
+                                _inteiro(payload.dano), _inteiro(payload.cd_tr)], dtype=np.int32)
+        except (TypeError, ValueError, OverflowError):
+            return False
+        self._codigos[slot] = codigos
+        self._dados[slot, :len(dados)] = dados
+        self._qtd_dados[slot] = len(payload.rolagens)
+        self._numeros[slot] = numeros
+        self._crit[slot] = payload.is_crit
+        return True
+
+    def _reconstruir_tabela(self):
+        """Refaz a tabela de internamento só com os valores das linhas vivas e renumera os arrays."""
+        usados = np.unique(self._codigos)
+        nova = _Internador()
+        # um a mais no fim: o código -1 (vazio) indexa a última posição e continua -1
+        novo_codigo = np.full(len(self._tabela) + 1, -1, dtype=np.int16)
+        for c in usados[usados >= 0]:
+            novo_codigo[c] = nova.codigo(self._tabela.valor(int(c)))
+        self._codigos[:] = novo_codigo[self._codigos]
+        self._tabela = nova
+
+    def _item(self, slot: int) -> dict:
+        """Remonta o item do slot (só na leitura)."""
+        ts = datetime.fromtimestamp(int(self._ts[slot])).strftime("%H:%M:%S")
+        if slot in self._soltos:
+            msg, payload = self._soltos[slot]
+            return {"msg": msg, "payload": payload, "ts": ts}
+        msg, textos, congelados = (self._tabela.valor(int(c)) for c in self._codigos[slot])
+        texto = dict(zip(_TEXTOS, textos))
+        d20, ataque_total, dano, cd_tr = (_opcional(v) for v in self._numeros[slot])
+        dados = self._dados[slot].tolist()
+        i = qtd = int(self._qtd_dados[slot])
+        extras = {}
+        for k, v in congelados:
+            if isinstance(v, _Lista):
+                v, i = dados[i:i + v.tamanho], i + v.tamanho
+            extras[k] = v
+        payload = Resultado(
+            habilidade=texto["habilidade"],
+            alcance=texto["alcance"],
+            descricao=texto["descricao"],
+            d20=d20,
+            ataque_total=ataque_total,
+            rolagens=dados[:qtd],
+            dano=dano,
+            is_crit=bool(self._crit[slot]),
+            cd_tr=cd_tr,
+            efeito=texto["efeito"],
+            descricao_extra=texto["descricao_extra"],
+            extras=extras,
+        )
+        return {"msg": msg, "payload": payload, "ts": ts}
+
+    def _slots_recentes(self):
+        for i in range(len(self)):
+            yield (self._total - 1 - i) % self.tamanho
+
+    def recentes(self, n: int = 10) -> list[dict]:
+        """As n rolagens mais novas, da mais nova pra mais antiga."""
+        return [self._item(slot) for _, slot in zip(range(n), self._slots_recentes())]
+
+    def antigos(self):
+        """Itera as rolagens que já foram pro disco (da mais antiga pra mais nova)."""
+        if not self.arquivo_spill or not os.path.exists(self.arquivo_spill):
+            return
+        with open(self.arquivo_spill, encoding="utf-8") as f:
+            for linha in f:
+                if linha.strip():
+                    yield json.loads(linha)
+
+    def _spill(self, item: dict):
+        os.makedirs(os.path.dirname(self.arquivo_spill) or ".", exist_ok=True)
+        with open(self.arquivo_spill, "a", encoding="utf-8") as f:
+            item = {**item, "payload": como_dict(item["payload"])}
+            f.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+
+    def __len__(self):
+        return min(self._total, self.tamanho)
+
+    def __iter__(self):
+        return (self._item(slot) for slot in self._slots_recentes())
+
+def arquivo_spill_sessao(sessao_id: str) -> str | None:
+    """Caminho do spill da sessão (None se o spill estiver desligado)."""
+    if not PASTA_SPILL:
+        return None
+    return os.path.join(PASTA_SPILL, f"historico_{sessao_id}.jsonl")
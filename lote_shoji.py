@@ -0,0 +1,43 @@
+import numpy as np
+from ataques_shoji import tabela_armas
+from nucleo_shoji import Build, compilar_plano
+
+# ---------------------------
+# Rolagens em lote (NumPy)
+# ---------------------------
+# Mesma regra do executar_plano (nucleo_shoji), só que N ataques de uma vez:
+#   - 1d20 + acerto (2d20 e fica o maior com vantagem)
+#   - CRIT se d20 >= crit_threshold -> rola os dados de crit no lugar dos normais
+#   - Dano = soma dos dados + bônus fixo
+
+def habilidade_lote(nome: str, build: Build, n: int, rng: np.random.Generator | None = None) -> dict[str, np.ndarray]:
+    """
+    Rola n usos da habilidade de uma vez, com o mesmo PlanoAtaque compilado do clique (nucleo_shoji).
+    Retorna colunas (arrays de tamanho n) com as mesmas chaves do resultado individual:
+    "D20", "Crit", "Rolagem de Ataque" e "Dano". Dá pra jogar direto num pd.DataFrame.
+    """
+    plano = compilar_plano(nome, build)
+    if rng is None:
+        rng = np.random.default_rng()
+
+    d20 = rng.integers(1, 21, size=(n, 2 if plano.vantagem else 1), dtype=np.int16).max(axis=1)
+    crit = d20 >= plano.crit_threshold
+
+    # só rola os dados de crit nas linhas que critaram (e os normais no resto)
+    dano = np.empty(n, dtype=np.int32)
+    n_crit = int(crit.sum())
+    dano[~crit] = plano.dano.rolar_lote(n - n_crit, rng)
+    dano[crit] = plano.dano_crit.rolar_lote(n_crit, rng)
+
+    return {
+        "D20": d20,
+        "Crit": crit,
+        "Rolagem de Ataque": d20.astype(np.int32) + plano.acerto,
+        "Dano": dano,
+    }
+
+def ataque_armado_lote(arma: str, n: int, rng: np.random.Generator | None = None) -> dict[str, np.ndarray]:
+    """Rola n ataques da arma de uma vez (Ataque Armado sem buffs)."""
+    if arma not in tabela_armas:
+        raise ValueError(f"Arma desconhecida: {arma}")
+    return habilidade_lote('Ataque Armado', Build(arma), n, rng)
@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+
+# ---------------------------
+# Métricas de tempo por fase do rerun (p50/p95 numa janela móvel)
+# ---------------------------
+# Uma instância por processo (compartilhada entre as sessões), então os percentis mostram
+# o que todo mundo conectado está pagando. Ambiente:
+#   SHOJI_METRICAS_JANELA=200        -> quantas medições por fase entram no p50/p95
+#   SHOJI_METRICAS_ARQUIVO=...       -> se definido, exporta pra lá (.json = JSON, senão texto do Prometheus)
+#   SHOJI_METRICAS_INTERVALO=10      -> de quantos em quantos segundos, no máximo, reescreve o arquivo
+JANELA_METRICAS = int(os.environ.get("SHOJI_METRICAS_JANELA", 200))
+ARQUIVO_METRICAS = os.environ.get("SHOJI_METRICAS_ARQUIVO") or None
+INTERVALO_EXPORTACAO = float(os.environ.get("SHOJI_METRICAS_INTERVALO", 10))
+
+class Metricas:
+    """Durações (ms) das últimas 'janela' execuções de cada fase + contagem e soma totais."""
+
+    def __init__(self, janela: int = JANELA_METRICAS, arquivo: str | None = ARQUIVO_METRICAS,
+                 intervalo: float = INTERVALO_EXPORTACAO):
+        self.janela = max(int(janela), 1)
+        self.arquivo = arquivo
+        self.intervalo = intervalo
+        self._duracoes = {}  # fase -> deque de ms
+        self._contagem = {}  # fase -> total de medições desde que o processo subiu
+        self._soma = {}      # fase -> soma de todas as medições (ms) desde que o processo subiu
+        self._ultima_exportacao = 0.0
+        self._lock = threading.Lock()
+
+    def registrar(self, fase: str, ms: float):
+        with self._lock:
+            if fase not in self._duracoes:
+                self._duracoes[fase] = deque(maxlen=self.janela)
+                self._contagem[fase] = 0
+                self._soma[fase] = 0.0
+            self._duracoes[fase].append(ms)
+            self._contagem[fase] += 1
+            self._soma[fase] += ms
+
+    @contextmanager
+    def medir(self, fase: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(fase, (time.perf_counter() - inicio) * 1000)
+
+    def resumo(self) -> dict[str, dict]:
+        """
+        fase -> {n, soma_total_ms, ultimo_ms, p50_ms, p95_ms}, na ordem em que as fases apareceram.
+        n e soma_total_ms contam desde que o processo subiu; ultimo/p50/p95 são da janela.
+        """
+        with self._lock:
+            copia = {fase: (np.array(d), self._contagem[fase], self._soma[fase]) for fase, d in self._duracoes.items()}
+        out = {}
+        for fase, (ms, n, soma) in copia.items():
+            p50, p95 = np.percentile(ms, [50, 95])
+            out[fase] = {"n": n, "soma_total_ms": round(soma, 3), "ultimo_ms": round(float(ms[-1]), 3),
+                         "p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3)}
+        return out
+
+    def texto_prometheus(self) -> str:
+        linhas = [
+            "# HELP shoji_fase_ms Duração das fases do rerun da ficha (ms; quantis da janela móvel, soma e contagem totais).",
+            "# TYPE shoji_fase_ms summary",
+        ]
+        for fase, r in self.resumo().items():
+            linhas.append(f'shoji_fase_ms{{fase="{fase}",quantile="0.5"}} {r["p50_ms"]}')
+            linhas.append(f'shoji_fase_ms{{fase="{fase}",quantile="0.95"}} {r["p95_ms"]}')
+            # só os quantis vêm da janela; _sum e _count são contadores (só sobem), senão o rate() do
+            # Prometheus lê cada queda como reset
+            linhas.append(f'shoji_fase_ms_sum{{fase="{fase}"}} {r["soma_total_ms"]}')
+            linhas.append(f'shoji_fase_ms_count{{fase="{fase}"}} {r["n"]}')
+        return "\n".join(linhas) + "\n"
+
+    def exportar(self, caminho: str | None = None, forcar: bool = False):
+        """Reescreve o arquivo de métricas (no máximo uma vez a cada 'intervalo' segundos, se não forçar)."""
+        caminho = caminho or self.arquivo
+        if not caminho:
+            return
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_exportacao < self.intervalo:
+            return
+        self._ultima_exportacao = agora
+        if caminho.endswith(".json"):
+            conteudo = json.dumps({"ts": time.time(), "fases": self.resumo()}, ensure_ascii=False, indent=2)
+        else:
+            conteudo = self.texto_prometheus()
+        # escreve num temporário e troca, pra quem lê (scraper) nunca pegar o arquivo pela metade
+        tmp = f"{caminho}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(conteudo)
+        os.replace(tmp, caminho)
@@ -0,0 +1,258 @@
+import math
+from dataclasses import dataclass, field, replace
+from functools import lru_cache, partial
+from ataques_shoji import dado, mod, tabela_armas, adicional_estilo_oculto, adicional_kukan, arma_dano_faces
+from expressoes_shoji import Expressao, compilar
+from resultado_shoji import Resultado
+
+# ---------------------------
+# Núcleo de combate (sem Streamlit)
+# ---------------------------
+# As regras das habilidades da ficha, recebendo tudo num Build explícito em vez de ler
+# os widgets (a ficha monta o Build e rola por aqui). Dá pra importar de scripts, simuladores e workers.
+
+@dataclass(frozen=True)
+class Build:
+    """Escolhas do painel Buffs/Armas + os números da ficha que as habilidades usam."""
+    arma: str
+    postura: str = 'Nenhuma'
+    estilo: str = 'Nenhum'
+    kukan: str = 'Nenhum'
+    vantagem: bool = False
+    golpe_descendente: bool = False
+    guarda: bool = False
+    gp_elemental: bool = False   # Golpe Pessoal: +3d6 de dano
+    gp_letal: bool = False       # Golpe Pessoal: +2 na margem de ameaça
+    gp_preciso: bool = False     # Golpe Pessoal: vantagem no ataque
+    nivel: int = 1
+    For: int = 10
+
+posturas = ('Nenhuma', 'Postura do Sol')
+
+def calcula_maestria(nivel: int) -> int:
+    #Calcula Maestria =Int(SOMA(1+ARREDONDAR.PARA.CIMA(nivel/4)))
+    return math.ceil(1 + nivel/4)
+
+# ---------------------------
+# Pipeline de modificadores do ataque
+# ---------------------------
+# Cada etapa mexe num rascunho (acerto, margem de crit, vantagem, dados extras, bônus de dano, metadados).
+# compilar_plano() passa o Build pelas etapas do ataque + as da habilidade UMA vez por seleção
+# (cache por (habilidade, Build)) e compila o dano em expressões de dados; cada clique / cada
+# encontro simulado só rola o PlanoAtaque pronto.
+
+@dataclass
+class _Rascunho:
+    habilidade: str
+    acerto: int
+    crit_threshold: int
+    dados: list[str]
+    dados_crit: list[str]
+    bonus_dano: int
+    vantagem: bool = False
+    extras: dict = field(default_factory=dict)
+    notas: list[str] = field(default_factory=list)
+    notas_crit: list[str] = field(default_factory=list)
+
+    def somar_dados(self, normal: str, crit: str | None = None):
+        self.dados.append(normal)
+        self.dados_crit.append(crit or normal)
+
+    def anotar(self, normal: str, crit: str | None = None):
+        self.notas.append(normal)
+        self.notas_crit.append(crit or normal)
+
+@dataclass(frozen=True)
+class PlanoAtaque:
+    habilidade: str
+    acerto: int
+    crit_threshold: int
+    vantagem: bool
+    dano: Expressao
+    dano_crit: Expressao
+    descricao: str
+    descricao_crit: str
+    descricao_extra: str | None
+    descricao_extra_crit: str | None
+    extras: tuple[tuple[str, object], ...]
+
+def _etapa_estilo(build: Build, r: _Rascunho):
+    # estilo oculto soma o mesmo valor na rolagem de ataque e no dano
+    bonus = adicional_estilo_oculto.get(build.estilo, 0)
+    r.acerto += bonus
+    r.bonus_dano += bonus
+    r.extras["Estilo Oculto"] = build.estilo
+    r.extras["Bônus Estilo (ataque/dano)"] = bonus
+
+def _etapa_kukan(build: Build, r: _Rascunho):
+    bonus = adicional_kukan.get(build.kukan, 0)
+    r.acerto += bonus
+    r.extras['Kukan no Kyoka'] = bonus
+
+def _etapa_postura(build: Build, r: _Rascunho):
+    r.extras["Postura"] = build.postura
+    if build.postura == 'Postura do Sol':
+        faces = arma_dano_faces[build.arma]
+        r.acerto += 2
+        r.somar_dados(f"1d{faces}")  # +1 dado do mesmo tipo da arma
+        r.extras["Bônus Postura (ataque)"] = 2
+        r.extras["Dados extras de dano"] = f"+1d{faces}"
+
+def _etapa_golpe_pessoal(build: Build, r: _Rascunho):
+    golpes = []
+    if build.gp_elemental:
+        r.somar_dados("3d6")
+        golpes.append("Elemental (+3d6)")
+    if build.gp_letal:
+        r.crit_threshold -= 2
+        golpes.append("Letal (+2 margem de ameaça)")
+    if build.gp_preciso:
+        r.vantagem = True
+        golpes.append("Preciso (vantagem)")
+    if golpes:
+        r.extras["Golpe Pessoal"] = ", ".join(golpes)
+
+def _etapa_vantagem(build: Build, r: _Rascunho):
+    if build.vantagem:
+        r.vantagem = True
+
+def _etapa_execucao_silenciosa(build: Build, r: _Rascunho):
+    # +1d8 de dano (+1d8 a cada 4 níveis)
+    dados_extra = (build.nivel // 4) + 1
+    r.somar_dados(f"{dados_extra}d8")
+    r.habilidade = f"{r.habilidade} + Execução Silenciosa"
+    r.anotar(f"Execução Silenciosa: +{dados_extra}d8 de dano.")
+
+def _etapa_corte_oculto(dados_normal: int, dados_crit: int, build: Build, r: _Rascunho):
+    # +dados da arma (mais dados no CRIT) + FOR (flat, não multiplicado)
+    faces = arma_dano_faces[build.arma]
+    for_bonus = mod(build.For)
+    r.somar_dados(f"{dados_normal}d{faces}", f"{dados_crit}d{faces}")
+    r.bonus_dano += for_bonus
+    r.habilidade = f"{r.habilidade} + Corte Oculto"
+    r.anotar(f"Corte Oculto: +{dados_normal}d{faces} + FOR({for_bonus}).",
+             f"Corte Oculto: +{dados_crit}d{faces} (crit) + FOR({for_bonus}).")
+
+# ordem das etapas = ordem em que os bônus aparecem no resultado
+etapas_ataque = (_etapa_estilo, _etapa_kukan, _etapa_postura, _etapa_golpe_pessoal, _etapa_vantagem)
+
+etapas_habilidade = {
+    'Ataque Armado': (),
+    'Execução Silenciosa': (_etapa_execucao_silenciosa,),
+    'Corte Oculto': (partial(_etapa_corte_oculto, 1, 2),),             # +1 dado da arma + FOR (+2 se CRIT)
+    'Corte Oculto - Ritual': (partial(_etapa_corte_oculto, 3, 6),),    # +3 dados da arma + FOR (+6 se CRIT)
+}
+
+def _expressao_dano(dados: list[str], bonus: int) -> Expressao:
+    return compilar("+".join(dados) + f"{bonus:+d}")
+
+@lru_cache(maxsize=256)
+def compilar_plano(habilidade: str, build: Build) -> PlanoAtaque:
+    """Passa o Build pelas etapas do ataque e da habilidade e compila o que sobra pra rolar."""
+    etapas = etapas_habilidade.get(habilidade)
+    if etapas is None:
+        raise ValueError(f"Habilidade desconhecida: {habilidade}")
+    info = tabela_armas.get(build.arma)
+    if not info:
+        raise ValueError(f"Arma desconhecida: {build.arma}")
+
+    faces, vezes = info["dados"]
+    faces_crit, vezes_crit = info["dados_crit"]
+    r = _Rascunho(
+        habilidade=info["nome"],
+        acerto=info["acerto"],
+        crit_threshold=info["crit_threshold"],
+        dados=[f"{vezes}d{faces}"],
+        dados_crit=[f"{vezes_crit}d{faces_crit}"],
+        bonus_dano=info["bonus_dano"],
+        extras={"Arma": build.arma},
+    )
+    for etapa in etapas_ataque + etapas:
+        etapa(build, r)
+
+    return PlanoAtaque(
+        habilidade=r.habilidade,
+        acerto=r.acerto,
+        crit_threshold=r.crit_threshold,
+        vantagem=r.vantagem,
+        dano=_expressao_dano(r.dados, r.bonus_dano),
+        dano_crit=_expressao_dano(r.dados_crit, r.bonus_dano),
+        descricao=info["descricao"],
+        descricao_crit=info["descricao_crit"],
+        descricao_extra=" | ".join(r.notas) or None,
+        descricao_extra_crit=" | ".join(r.notas_crit) or None,
+        extras=tuple(r.extras.items()),
+    )
+
+def executar_plano(plano: PlanoAtaque) -> Resultado:
+    """Rola o plano: 1d20 (2d20 e fica o maior com vantagem) + acerto; no CRIT rola o dano de crit."""
+    d20s = dado(20, 2 if plano.vantagem else 1)
+    roll_20 = max(d20s)
+    is_crit = roll_20 >= plano.crit_threshold
+    dano, rols = (plano.dano_crit if is_crit else plano.dano).rolar()
+    res = Resultado(
+        habilidade=plano.habilidade,
+        alcance="Pessoal",
+        descricao=plano.descricao_crit if is_crit else plano.descricao,
+        d20=roll_20,
+        ataque_total=roll_20 + plano.acerto,
+        rolagens=rols,
+        dano=dano,
+        is_crit=is_crit,
+        descricao_extra=plano.descricao_extra_crit if is_crit else plano.descricao_extra,
+        extras=dict(plano.extras),
+    )
+    if plano.vantagem:
+        res.extras["D20 (vantagem)"] = d20s
+    return res
+
+# ---------------------------
+# Habilidades
+# ---------------------------
+
+def usar_habilidade(nome: str, build: Build) -> Resultado:
+    return executar_plano(compilar_plano(nome, build))
+
+# ---------------------------
+# Modificadores de CA / RD
+# ---------------------------
+
+def mod_ca_golpe_descendente(build: Build) -> int:
+    return calcula_maestria(build.nivel) if build.golpe_descendente else 0
+
+def mod_ca_postura(build: Build) -> int:
+    return -4 if build.postura == 'Postura do Sol' else 0
+
+def modificadores_ca(build: Build, ca_outros: int = 0) -> int:
+    return mod_ca_golpe_descendente(build) + mod_ca_postura(build) + ca_outros
+
+def mod_rd_adagas(build: Build) -> int:
+    if build.arma in ('Cardume de Adagas (G 3)', 'Adaga de Aparar (G 4)'):
+        return 4*calcula_maestria(build.nivel)
+    return 0
+
+def mod_rd_guarda(build: Build) -> int:
+    if build.guarda:
+        return tabela_armas[build.arma]["acerto"] + (build.nivel//2) + adicional_kukan.get(build.kukan, 0)
+    return 0
+
+def modificadores_rd(build: Build, rd_outros: int = 0) -> int:
+    return mod_rd_adagas(build) + mod_rd_guarda(build) + rd_outros
+
+# ---------------------------
+# Custo em PE do Golpe Pessoal
+# ---------------------------
+
+CUSTO_GP_ELEMENTAL = 3
+CUSTO_GP_LETAL = 2
+CUSTO_GP_PRECISO = (1, 2)  # primeiro uso, do segundo em diante
+
+def custo_golpe_pessoal(build: Build, usos_preciso: int = 0) -> int:
+    """PE dos Golpes Pessoais marcados no Build (usos_preciso: quantas vezes o Preciso já foi usado antes)."""
+    custo = CUSTO_GP_ELEMENTAL * build.gp_elemental + CUSTO_GP_LETAL * build.gp_letal
+    if build.gp_preciso:
+        custo += CUSTO_GP_PRECISO[min(usos_preciso, 1)]
+    return custo
+
+def sem_golpe_pessoal(build: Build) -> Build:
+    return replace(build, gp_elemental=False, gp_letal=False, gp_preciso=False)
@@ -0,0 +1,81 @@
+from dataclasses import replace
+from functools import lru_cache
+from itertools import product
+import numpy as np
+import pandas as pd
+import nucleo_shoji as nucleo
+from ataques_shoji import tabela_armas, adicional_estilo_oculto, adicional_kukan
+from distribuicoes_shoji import chance_crit, chance_acerto
+from nucleo_shoji import Build
+
+# ---------------------------
+# Otimizador de build (arma x postura x estilo x kukan x habilidade)
+# ---------------------------
+# Cada combinação vira um Build e passa uma vez pelo compilar_plano (o mesmo pipeline da ficha, com
+# Vantagem e Golpe Pessoal do Build base); do plano só ficam arrays (acerto, margem, vantagem, dano
+# médio normal/crit), e o dano esperado contra uma CA sai de todas de uma vez (arrays NumPy, sem loop
+# por combinação). Marca as dominadas: outra combinação tem dano >= , CA >= e RD >= (com pelo menos
+# um estritamente melhor).
+
+_COLUNAS = ["Arma", "Postura", "Estilo Oculto", "Kukan no Kyoka", "Habilidade"]
+
+@lru_cache(maxsize=32)
+def _grade(base: Build, armas: tuple[str, ...]) -> tuple[pd.DataFrame, dict[str, np.ndarray]]:
+    """Compila os planos da grade (não depende da CA do alvo): rótulos + arrays por combinação."""
+    rotulos, planos, defesas = [], [], []
+    for arma, postura, estilo, kukan, habilidade in product(
+            armas, nucleo.posturas, adicional_estilo_oculto, adicional_kukan, nucleo.etapas_habilidade):
+        build = replace(base, arma=arma, postura=postura, estilo=estilo, kukan=kukan)
+        rotulos.append((arma, postura, estilo, kukan, habilidade))
+        planos.append(nucleo.compilar_plano(habilidade, build))
+        defesas.append((nucleo.modificadores_ca(build), nucleo.modificadores_rd(build)))
+    arrays = {
+        "acerto": np.array([p.acerto for p in planos]),
+        "crit_threshold": np.array([p.crit_threshold for p in planos]),
+        "vezes": np.array([2 if p.vantagem else 1 for p in planos]),
+        "media_normal": np.array([p.dano.media() for p in planos]),
+        "media_crit": np.array([p.dano_crit.media() for p in planos]),
+        "defesas": np.array(defesas),
+    }
+    for arr in arrays.values():
+        arr.setflags(write=False)
+    return pd.DataFrame(rotulos, columns=_COLUNAS), arrays
+
+def _fronteira(dano: np.ndarray, defesas: np.ndarray) -> np.ndarray:
+    """
+    True para as combinações não dominadas (maior é melhor em tudo).
+    Poda primeiro: dentro de cada grupo com as mesmas defesas (CA, RD) só o maior dano pode sobrar,
+    aí a comparação par a par fica só entre esses poucos candidatos.
+    """
+    grupos, grupo = np.unique(defesas, axis=0, return_inverse=True)
+    melhor = np.full(len(grupos), -np.inf)
+    np.maximum.at(melhor, grupo, dano)
+    candidatos = np.flatnonzero(dano >= melhor[grupo])
+
+    o = np.column_stack([dano[candidatos], defesas[candidatos]])
+    ge = (o[None, :, :] >= o[:, None, :]).all(axis=2)
+    gt = (o[None, :, :] > o[:, None, :]).any(axis=2)
+    nao_dominado = np.zeros(len(dano), dtype=bool)
+    nao_dominado[candidatos[~(ge & gt).any(axis=1)]] = True
+    return nao_dominado
+
+def otimizar_build(ca_alvo: int, base: Build, so_nao_dominados: bool = False,
+                   armas: tuple[str, ...] | None = None) -> pd.DataFrame:
+    """
+    Ranking de todas as combinações pelo dano esperado contra 'ca_alvo' (armas: as da ficha; padrão todas).
+    base: o resto do Build (vantagem, Golpe Pessoal, guarda, nível, FOR...) fica fixo em todas as combinações.
+    Mod CA / Mod RD vêm dos modificadores do nucleo_shoji (Postura do Sol, adagas, guarda).
+    """
+    rotulos, g = _grade(base, tuple(armas or tabela_armas))
+    # mesma conta do distribuicoes_shoji.distribuicao_plano, só que pra grade inteira (vantagem: 2d20, fica o maior)
+    p_crit = 1 - (1 - chance_crit(g["crit_threshold"])) ** g["vezes"]
+    p_acerto = 1 - (1 - chance_acerto(g["acerto"], g["crit_threshold"], ca_alvo)) ** g["vezes"]
+    dano = (p_acerto - p_crit) * g["media_normal"] + p_crit * g["media_crit"]
+
+    df = rotulos.assign(**{"Dano esperado": dano.round(2), "Chance de acerto": p_acerto,
+                          "Mod CA": g["defesas"][:, 0], "Mod RD": g["defesas"][:, 1]})
+    nao_dominado = _fronteira(dano, g["defesas"])
+    df["Dominada"] = ~nao_dominado
+    if so_nao_dominados:
+        df = df[nao_dominado]
+    return df.sort_values("Dano esperado", ascending=False, kind="stable").reset_index(drop=True)
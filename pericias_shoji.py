@@ -0,0 +1,162 @@
+from dataclasses import dataclass
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# ---------------------------
+# Perícias - ETL (pericias.csv -> df com "Total")
+# ---------------------------
+
+@dataclass(frozen=True)
+class TabelaPericias:
+    """Quem ganha maestria, especialização, bônus "outros" fixos e o bônus do Kukan (vem do json do personagem)."""
+    maestria: tuple[str, ...] = ()
+    especializacao: tuple[str, ...] = ()
+    outros: tuple[tuple[int, tuple[str, ...]], ...] = ()  # ((valor, (perícias...)), ...)
+    kukan: tuple[str, ...] = ()
+
+def _coluna_outros(valor: int) -> str:
+    # mesmo nome das colunas antigas: Outros2, Outros4, ..., Outrosmenos6
+    return f"Outros{valor}" if valor >= 0 else f"Outrosmenos{-valor}"
+
+# ---------------------------
+# Matriz de modificadores (perícia x fonte de bônus)
+# ---------------------------
+# Cada fonte de bônus é uma coluna; a linha da perícia diz quanto cada unidade da fonte soma nela
+# (1 no atributo dela, 1 se tem maestria, o valor do "outros", ...). O personagem vira um vetor
+# com o valor de cada fonte (mod de cada atributo, nível//2, maestria, ...) e o Total é M @ v.
+# Pra vários personagens/NPCs com a mesma tabela: M @ V.T, uma multiplicação só.
+# Fonte nova = uma coluna a mais na matriz e um número a mais no vetor.
+
+ATRIBUTOS = ("For", "Des", "Con", "Int", "Sab", "Car")
+
+# rótulos tolerantes do csv -> índice em ATRIBUTOS
+_ROTULOS_ATRIBUTO = {
+    "for": 0, "força": 0, "forca": 0, "str": 0,
+    "des": 1, "dex": 1, "destreza": 1,
+    "con": 2, "constituição": 2, "constituicao": 2,
+    "int": 3, "inteligência": 3, "inteligencia": 3,
+    "sab": 4, "sabedoria": 4,
+    "car": 5, "carisma": 5,
+}
+
+@dataclass(frozen=True, eq=False)
+class MatrizPericias:
+    """Perícias (linhas) x fontes de bônus (colunas) de uma tabela de perícias."""
+    pericias: tuple[str, ...]
+    fontes: tuple[str, ...]
+    matriz: np.ndarray  # int64, só leitura
+    n_outros: int       # colunas "Outros..." (entre Especializacao e Kukan)
+
+    def vetor(self, nivel, maestria, atributos, per_kukan=0) -> np.ndarray:
+        """
+        Valor de cada fonte pra um personagem -> (fontes,); ou pra k personagens, passando nivel/maestria/
+        per_kukan com k valores e atributos (k, 6) -> (k, fontes).
+        """
+        atributos = np.asarray(atributos, dtype=np.int64)
+        k = atributos.shape[:-1]
+
+        def coluna(x):
+            return np.broadcast_to(np.asarray(x, dtype=np.int64)[..., None], k + (1,))
+
+        nivel, maestria = np.asarray(nivel), np.asarray(maestria)
+        return np.concatenate([
+            (atributos - 10) // 2,  # mesmo arredondamento do mod() do ataques_shoji
+            coluna(nivel // 2),
+            coluna(maestria),
+            coluna(maestria // 2),
+            np.ones(k + (self.n_outros,), dtype=np.int64),
+            coluna(per_kukan),
+        ], axis=-1)
+
+    def totais(self, vetores: np.ndarray) -> np.ndarray:
+        """Total de cada perícia: (pericias,) pra um vetor, (k, pericias) pra k vetores."""
+        return np.asarray(vetores) @ self.matriz.T
+
+    def componentes(self, vetor: np.ndarray) -> np.ndarray:
+        """Quanto cada fonte soma em cada perícia (pericias, fontes), pra um personagem."""
+        return self.matriz * vetor
+
+def montar_matriz(df: pd.DataFrame, tabela: TabelaPericias, col_pericia: str = "Pericia") -> MatrizPericias:
+    """Monta a matriz a partir do csv (colunas Pericia/Atributo) e da tabela do personagem."""
+    pericias = df[col_pericia].astype(str).tolist()
+    indice = {p: i for i, p in enumerate(pericias)}
+    valores_outros = list(dict.fromkeys(valor for valor, _ in tabela.outros))
+    fontes = (*ATRIBUTOS, "LvlHalf", "Maestria", "Especializacao",
+              *(_coluna_outros(v) for v in valores_outros), "Kukan")
+    col = {f: j for j, f in enumerate(fontes)}
+    m = np.zeros((len(pericias), len(fontes)), dtype=np.int64)
+
+    for i, rotulo in enumerate(df["Atributo"]):
+        a = _ROTULOS_ATRIBUTO.get(str(rotulo).strip().lower())
+        if a is not None:
+            m[i, a] = 1
+    m[:, col["LvlHalf"]] = 1
+
+    def marcar(nomes, coluna, valor=1):
+        linhas = [indice[p] for p in nomes if p in indice]
+        m[linhas, col[coluna]] += valor
+
+    marcar(tabela.maestria, "Maestria")
+    marcar(tabela.especializacao, "Especializacao")
+    for valor, nomes in tabela.outros:
+        marcar(nomes, _coluna_outros(valor), valor)
+    marcar(tabela.kukan, "Kukan")
+    m.setflags(write=False)
+    return MatrizPericias(tuple(pericias), fontes, m, len(valores_outros))
+
+def calcular_pericias_base(caminho: str, nivel: int, maestria: int, atributos: tuple[int, int, int, int, int, int], tabela: TabelaPericias) -> pd.DataFrame:
+    """
+    Lê o csv de perícias e monta as colunas de bônus que não dependem do Kukan + "Total" sem o Kukan.
+    atributos = (For, Des, Con, Int, Sab, Car).
+    """
+    df = pd.read_csv(caminho)
+    m = montar_matriz(df, tabela)
+    v = m.vetor(nivel, maestria, atributos)  # per_kukan = 0: o Kukan entra no aplicar_kukan
+    comp = m.componentes(v)
+
+    df["ModAtrib"] = comp[:, :len(ATRIBUTOS)].sum(axis=1)
+    for j, fonte in enumerate(m.fontes[len(ATRIBUTOS):-1], start=len(ATRIBUTOS)):
+        df[fonte] = comp[:, j]
+    df["Total"] = m.totais(v)
+    return df
+
+def aplicar_kukan(base: pd.DataFrame, per_kukan: int, tabela: TabelaPericias) -> pd.DataFrame:
+    """Soma o bônus do Kukan (perícias de tabela.kukan) no df do calcular_pericias_base, sem mexer nele."""
+    df = base.drop(columns="Total")
+    df["Kukan"] = np.where(df["Pericia"].isin(tabela.kukan), per_kukan, 0)
+    df["Total"] = base["Total"] + df["Kukan"]
+    return df
+
+def calcular_pericias(caminho: str, nivel: int, maestria: int, atributos: tuple[int, int, int, int, int, int], per_kukan: int, tabela: TabelaPericias) -> pd.DataFrame:
+    """
+    Lê o csv de perícias e monta as colunas de bônus + "Total".
+    atributos = (For, Des, Con, Int, Sab, Car); per_kukan = bônus do Kukan nas perícias de tabela.kukan.
+    """
+    return aplicar_kukan(calcular_pericias_base(caminho, nivel, maestria, atributos, tabela), per_kukan, tabela)
+
+# ---------------------------
+# Chance de passar no teste (perícia x CD)
+# ---------------------------
+# P(d20 + Total >= CD) = (21 - (CD - Total)) / 20, limitado entre 0 e 1; com vantagem 1 - (1 - p)².
+# A linha de cada Total fica em cache: quando o Kukan muda só o Total da Luta, só essa linha é recalculada.
+
+CDS_TESTE = tuple(range(5, 41))
+
+@lru_cache(maxsize=512)
+def _linha_sucesso(total: int, vantagem: bool, cds: tuple[int, ...]) -> np.ndarray:
+    p = np.clip((21 - (np.array(cds) - total)) / 20, 0.0, 1.0)
+    if vantagem:
+        p = 1 - (1 - p) ** 2
+    p.setflags(write=False)
+    return p
+
+def chance_sucesso(total: int, cd: int, vantagem: bool = False) -> float:
+    """P(passar) de uma perícia com esse Total contra uma CD."""
+    return float(_linha_sucesso(int(total), vantagem, (int(cd),))[0])
+
+def matriz_sucesso(df: pd.DataFrame, vantagem: bool = False, cds: tuple[int, ...] = CDS_TESTE) -> pd.DataFrame:
+    """Perícias (linhas) x CDs (colunas) com P(sucesso), a partir do df["Total"] do calcular_pericias."""
+    col_pericia = "Perícia" if "Perícia" in df.columns else "Pericia"
+    linhas = [_linha_sucesso(int(t), vantagem, cds) for t in df["Total"]]
+    return pd.DataFrame(np.vstack(linhas), index=df[col_pericia], columns=list(cds))
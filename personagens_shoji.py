@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+from dataclasses import dataclass
+from ataques_shoji import mod, tabela_armas
+from nucleo_shoji import calcula_maestria
+from pericias_shoji import TabelaPericias
+
+# ---------------------------
+# Registro de personagens (um json por ficha em personagens/)
+# ---------------------------
+# Os Personagem são imutáveis e ficam num registro só por processo: todas as sessões
+# compartilham os mesmos objetos (e os caches de perícias/distribuições que dependem deles).
+# Na sessão só fica o que muda na mesa (PV/PE atuais, histórico...).
+# SHOJI_PERSONAGENS=pasta -> onde procurar os .json
+
+PASTA_PERSONAGENS = os.environ.get("SHOJI_PERSONAGENS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "personagens"))
+
+@dataclass(frozen=True)
+class Personagem:
+    id: str
+    nome: str
+    nivel: int
+    For: int
+    Des: int
+    Con: int
+    Int: int
+    Sab: int
+    Car: int
+    ca_natural: int
+    uniforme: int
+    escudo: int
+    ca_outros: int
+    rd: int
+    pv: int
+    pe: int
+    pe_maximo_armazenado: int
+    armas: tuple[str, ...]
+    pericias: TabelaPericias
+    csv_pericias: str = "pericias.csv"
+    imagem: str | None = None
+    subtitulo: str = ""
+    descricao: tuple[str, ...] = ()
+
+    @property
+    def atributos(self) -> tuple[int, int, int, int, int, int]:
+        return (self.For, self.Des, self.Con, self.Int, self.Sab, self.Car)
+
+    @property
+    def maestria(self) -> int:
+        return calcula_maestria(self.nivel)
+
+    @property
+    def CA(self) -> int:
+        return self.ca_natural + self.uniforme + self.escudo + self.ca_outros  # mod des n aplicavel
+
+    @property
+    def cd_do_tr(self) -> int:
+        return 10 + self.maestria + mod(self.Int) + 1
+
+def carregar_personagem(caminho: str) -> Personagem:
+    """Lê e valida o json de um personagem."""
+    with open(caminho, encoding="utf-8") as f:
+        dados = json.load(f)
+
+    armas = tuple(dados["armas"])
+    desconhecidas = [a for a in armas if a not in tabela_armas]
+    if desconhecidas:
+        raise ValueError(f"Arma desconhecida em {caminho}: {', '.join(desconhecidas)}")
+
+    per = dados.get("pericias", {})
+    tabela = TabelaPericias(
+        maestria=tuple(per.get("maestria", ())),
+        especializacao=tuple(per.get("especializacao", ())),
+        outros=tuple((int(valor), tuple(nomes)) for valor, nomes in per.get("outros", ())),
+        kukan=tuple(per.get("kukan", ())),
+    )
+    atr = dados["atributos"]
+    ca = dados.get("ca", {})
+    return Personagem(
+        id=os.path.splitext(os.path.basename(caminho))[0],
+        nome=dados["nome"],
+        nivel=int(dados["nivel"]),
+        For=int(atr["For"]), Des=int(atr["Des"]), Con=int(atr["Con"]),
+        Int=int(atr["Int"]), Sab=int(atr["Sab"]), Car=int(atr["Car"]),
+        ca_natural=int(ca.get("natural", 10)),
+        uniforme=int(ca.get("uniforme", 0)),
+        escudo=int(ca.get("escudo", 0)),
+        ca_outros=int(ca.get("outros", 0)),
+        rd=int(dados.get("rd", 0)),
+        pv=int(dados["pv"]),
+        pe=int(dados["pe"]),
+        pe_maximo_armazenado=int(dados.get("pe_maximo_armazenado", 0)),
+        armas=armas,
+        pericias=tabela,
+        csv_pericias=per.get("csv", "pericias.csv"),
+        imagem=dados.get("imagem"),
+        subtitulo=dados.get("subtitulo", ""),
+        descricao=tuple(dados.get("descricao", ())),
+    )
+
+class RegistroPersonagens:
+    """Carrega os personagens da pasta sob demanda e recarrega se o json mudar (mtime)."""
+
+    def __init__(self, pasta: str = PASTA_PERSONAGENS):
+        self.pasta = pasta
+        self._cache = {}  # id -> (mtime_ns, Personagem)
+        self._lock = threading.Lock()
+
+    def ids(self) -> list[str]:
+        if not os.path.isdir(self.pasta):
+            return []
+        return sorted(os.path.splitext(n)[0] for n in os.listdir(self.pasta) if n.endswith(".json"))
+
+    def get(self, pid: str) -> Personagem:
+        if pid not in self.ids():
+            raise KeyError(f"Personagem desconhecido: {pid}")
+        caminho = os.path.join(self.pasta, f"{pid}.json")
+        mtime = os.stat(caminho).st_mtime_ns
+        with self._lock:
+            atual = self._cache.get(pid)
+            if atual is None or atual[0] != mtime:
+                atual = (mtime, carregar_personagem(caminho))
+                self._cache[pid] = atual
+            return atual[1]
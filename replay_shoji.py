@@ -0,0 +1,129 @@
+import argparse
+import contextvars
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+import nucleo_shoji as nucleo
+from ataques_shoji import rolar_pericia
+from banco_shoji import CAMINHO_BANCO, BancoRolagens
+from dados_shoji import BackendNumpy, usar_backend
+from nucleo_shoji import Build
+from resultado_shoji import Resultado, como_dict
+
+# ---------------------------
+# Replay determinístico de uma sessão (semente + invocações em ordem)
+# ---------------------------
+# Cada sessão grava a semente do BackendNumpy dela e, junto de cada rolagem no SQLite, a invocação
+# que gerou a rolagem (habilidade + Build inteiro, ou perícia + total). Como o backend só depende da
+# semente e da ordem dos pedidos, rodar as mesmas invocações na mesma ordem dá os mesmos dados:
+#   python replay_shoji.py <sessao>                  -> refaz a sessão toda e confere com o que foi salvo
+#   python replay_shoji.py <sessao> --rolagem 123    -> mostra a rolagem 123 refeita (ex.: crit contestado)
+# Sem Streamlit: os planos saem do cache do nucleo_shoji, então a sessão roda na velocidade do lote.
+
+@dataclass(frozen=True)
+class Invocacao:
+    """O que foi pedido pra ficha: 'habilidade' (nome do nucleo + Build) ou 'pericia' (nome + total)."""
+    tipo: str
+    nome: str
+    build: Build | None = None
+    total: int | None = None
+
+    @classmethod
+    def habilidade(cls, nome: str, build: Build) -> "Invocacao":
+        return cls("habilidade", nome, build=build)
+
+    @classmethod
+    def pericia(cls, nome: str, total: int) -> "Invocacao":
+        return cls("pericia", nome, total=int(total))
+
+    def as_dict(self) -> dict:
+        d = {"tipo": self.tipo, "nome": self.nome}
+        if self.build is not None:
+            d["build"] = asdict(self.build)
+        if self.total is not None:
+            d["total"] = self.total
+        return d
+
+    @classmethod
+    def de_dict(cls, d: dict) -> "Invocacao":
+        build = Build(**d["build"]) if d.get("build") is not None else None
+        return cls(d["tipo"], d["nome"], build=build, total=d.get("total"))
+
+def executar(inv: Invocacao) -> Resultado:
+    """Rola a invocação com o backend de dados ativo (a ficha e o replay passam pelo mesmo caminho)."""
+    if inv.tipo == "habilidade":
+        return nucleo.usar_habilidade(inv.nome, inv.build)
+    if inv.tipo == "pericia":
+        return rolar_pericia(inv.nome, inv.total)
+    raise ValueError(f"Invocação desconhecida: {inv.tipo!r}")
+
+def reproduzir(seed: int, invocacoes, tamanho_buffer: int | None = None) -> list[Resultado]:
+    """
+    Refaz as invocações em ordem com um backend novo da mesma semente.
+    Roda num contexto copiado, então não troca o backend de quem chamou.
+    """
+    backend = BackendNumpy(seed=seed) if tamanho_buffer is None else BackendNumpy(seed=seed, tamanho_buffer=tamanho_buffer)
+
+    def rodar():
+        usar_backend(backend)
+        return [executar(inv) for inv in invocacoes]
+
+    return contextvars.copy_context().run(rodar)
+
+def carregar_sessao(banco: BancoRolagens, sessao: str) -> tuple[dict, list[dict]]:
+    """(semente da sessão, rolagens com invocação em ordem). KeyError se a sessão não tiver semente salva."""
+    dados = banco.sessao(sessao)
+    if dados is None:
+        raise KeyError(f"Sessão sem semente salva: {sessao}")
+    rolagens = [item for item in banco.iterar(sessao=sessao) if item.get("invocacao") is not None]
+    return dados, rolagens
+
+def conferir_sessao(banco: BancoRolagens, sessao: str, ate_id: int | None = None) -> list[dict]:
+    """
+    Refaz a sessão (ou até a rolagem 'ate_id') e compara com o payload salvo.
+    Retorna [{id, msg, salvo, refeito, confere}] na ordem das rolagens.
+    """
+    dados, rolagens = carregar_sessao(banco, sessao)
+    if ate_id is not None:
+        ids = [item["id"] for item in rolagens]
+        if ate_id not in ids:
+            raise KeyError(f"Rolagem {ate_id} não é uma rolagem com invocação da sessão {sessao}")
+        rolagens = rolagens[:ids.index(ate_id) + 1]
+    invocacoes = [Invocacao.de_dict(item["invocacao"]) for item in rolagens]
+    refeitos = reproduzir(dados["seed"], invocacoes, dados.get("tamanho_buffer"))
+    out = []
+    for item, res in zip(rolagens, refeitos):
+        # passa pelo json pra comparar do mesmo jeito que foi salvo
+        refeito = json.loads(json.dumps(como_dict(res), ensure_ascii=False, default=str))
+        out.append({"id": item["id"], "msg": item["msg"], "salvo": item["payload"],
+                    "refeito": refeito, "confere": refeito == item["payload"]})
+    return out
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refaz (bit a bit) as rolagens de uma sessão salva no SQLite.")
+    parser.add_argument("sessao")
+    parser.add_argument("--rolagem", type=int, default=None, help="id da rolagem a mostrar (refaz só até ela)")
+    parser.add_argument("--banco", default=CAMINHO_BANCO)
+    a = parser.parse_args()
+
+    if not os.path.exists(a.banco):
+        parser.error(f"banco não encontrado: {a.banco}")
+    banco = BancoRolagens(a.banco)
+    inicio = time.perf_counter()
+    try:
+        conferidas = conferir_sessao(banco, a.sessao, a.rolagem)
+    except KeyError as e:
+        parser.exit(1, f"{e.args[0]}\n")
+    ms = (time.perf_counter() - inicio) * 1000
+
+    if a.rolagem is not None:
+        r = conferidas[-1]
+        print(f"Rolagem {r['id']} ({r['msg']}): {'confere' if r['confere'] else 'DIVERGE'}")
+        print(json.dumps({"salvo": r["salvo"], "refeito": r["refeito"]}, ensure_ascii=False, indent=2))
+    else:
+        divergentes = [r for r in conferidas if not r["confere"]]
+        print(f"{len(conferidas)} rolagens refeitas em {ms:.1f} ms, {len(divergentes)} divergente(s)")
+        for r in divergentes:
+            print(f"  #{r['id']} {r['msg']}")
+    parser.exit(1 if any(not r["confere"] for r in conferidas) else 0)
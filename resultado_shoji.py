@@ -0,0 +1,65 @@
+from dataclasses import dataclass, field
+
+# ---------------------------
+# Resultado de rolagem (registro com __slots__ no lugar do dict solto)
+# ---------------------------
+# Campos explícitos (is_crit, d20, ataque_total, dano, rolagens): ninguém mais precisa
+# procurar "CRIT" na descrição nem varrer as chaves do dict pra achar o dano.
+# as_dict() devolve a visão com as chaves de sempre, pro st.json / histórico / SQLite.
+
+@dataclass(slots=True)
+class Resultado:
+    habilidade: str
+    alcance: str | None = None
+    descricao: str | None = None
+    d20: int | None = None
+    ataque_total: int | None = None
+    rolagens: list[int] = field(default_factory=list)
+    dano: int | None = None
+    is_crit: bool = False
+    cd_tr: int | None = None
+    efeito: str | None = None
+    descricao_extra: str | None = None
+    extras: dict = field(default_factory=dict)  # metadados (Arma, Postura, bônus...) só pra exibir
+
+    def adicionar_descricao_extra(self, txt: str):
+        self.descricao_extra = f"{self.descricao_extra} | {txt}" if self.descricao_extra else txt
+
+    def resultado_principal(self) -> tuple[str, object]:
+        """(rótulo, valor) do número grande do card."""
+        if self.dano is not None:
+            return "Dano", self.dano
+        if self.ataque_total is not None:
+            return "Resultado", self.ataque_total
+        if self.rolagens:
+            return "Resultado", sum(self.rolagens)
+        return "Resultado", self.cd_tr if self.cd_tr is not None else "-"
+
+    def as_dict(self) -> dict:
+        d = {"Habilidade": self.habilidade}
+        if self.alcance is not None:
+            d["Alcance"] = self.alcance
+        if self.descricao is not None:
+            d["Descrição"] = self.descricao
+        if self.d20 is not None:
+            d["D20"] = self.d20
+        if self.ataque_total is not None:
+            d["Rolagem de Ataque"] = self.ataque_total
+        if self.rolagens:
+            d["Rolagens"] = list(self.rolagens)
+        if self.dano is not None:
+            d["Dano"] = self.dano
+        if self.d20 is not None and self.dano is not None:
+            d["Crit"] = self.is_crit
+        if self.cd_tr is not None:
+            d["CD do TR"] = self.cd_tr
+        if self.efeito is not None:
+            d["Efeito"] = self.efeito
+        d.update(self.extras)
+        if self.descricao_extra:
+            d["Descrição Extra"] = self.descricao_extra
+        return d
+
+def como_dict(payload) -> dict:
+    """Resultado -> dict; dict continua dict (rolagens antigas / habilidades que ainda montam dict)."""
+    return payload.as_dict() if isinstance(payload, Resultado) else payload
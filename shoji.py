@@ -1,17 +1,61 @@
 import streamlit as st
-import math
-import random
+import os
+import time
+import uuid
+from collections import deque
+from dataclasses import replace
 from datetime import datetime
 from html import escape
 import pandas as pd
 import numpy as np
-from ataques_shoji import ataque_armado as aa
+import altair as alt
+from dados_shoji import BackendNumpy, usar_backend
+from pericias_shoji import TabelaPericias, calcular_pericias_base, chance_sucesso, matriz_sucesso
+from derivados_shoji import grafo_ficha
+from personagens_shoji import RegistroPersonagens
+from historico_shoji import HistoricoRolagens, TAMANHO_HISTORICO, arquivo_spill_sessao
+from banco_shoji import BancoRolagens
+from otimizador_shoji import otimizar_build
+from distribuicoes_shoji import distribuicao_plano
+import nucleo_shoji as nucleo
+from nucleo_shoji import Build
+from metricas_shoji import Metricas
+from feed_shoji import FeedMesa, INTERVALO_FEED
+from resultado_shoji import Resultado, como_dict
+from replay_shoji import Invocacao, executar
+inicio_rerun = time.perf_counter()
+
+@st.cache_resource(show_spinner=False)
+def metricas() -> Metricas:
+    """Tempos por fase do rerun, compartilhados por todas as sessões do processo (ver metricas_shoji)."""
+    return Metricas()
+
+# ---------------------------
+# Personagem (registro compartilhado pelo processo, ver personagens_shoji)
+# ---------------------------
+@st.cache_resource(show_spinner=False)
+def registro_personagens() -> RegistroPersonagens:
+    return RegistroPersonagens()
+
+ids_personagens = registro_personagens().ids()
+if not ids_personagens:
+    st.error(f"Nenhum personagem em {registro_personagens().pasta} (defina SHOJI_PERSONAGENS ou crie a pasta com as fichas).")
+    st.stop()
+personagem_id = st.query_params.get("personagem", "shoji")
+if personagem_id not in ids_personagens:
+    personagem_id = "shoji" if "shoji" in ids_personagens else ids_personagens[0]
+personagem = registro_personagens().get(personagem_id)
+
 # ---------------------------
 # Configuração da página
 # ---------------------------
-st.set_page_config(page_title="Ficha Shoji Yoshiro", layout="wide")
+st.set_page_config(page_title=f"Ficha {personagem.nome}", layout="wide")
+
+# ?debug=1 na URL (ou SHOJI_DEBUG=1) mostra o painel de tempos na sidebar
+modo_debug = st.query_params.get("debug") == "1" or os.environ.get("SHOJI_DEBUG") == "1"
 
-st.markdown("""
+with metricas().medir("css"):
+    st.markdown("""
 <style>
 .big-num{font-size:2.4rem;font-weight:800;line-height:1;margin:.15rem 0 .35rem 0}
 .pill{display:inline-block;padding:.15rem .55rem;border:1px solid rgba(255,255,255,.18);
@@ -22,16 +66,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def rolar_pericia(nome: str, total: int) -> dict:
-    """Rola 1d20 + total para teste de perícia."""
-    d20 = random.randint(1, 20)
-    return {
-        "Habilidade": f"Perícia – {nome}",
-        "D20": d20,
-#        "Rolagens": [d20],            # mostra o d20
-        "Ataque": d20 + int(total),   # 'show_result' exibe como Ataque/Teste
-    }
-
 def pericias_ui(df):
     col_pericia = "Perícia" if "Perícia" in df.columns else "Pericia"
 
@@ -58,10 +92,10 @@ def pericias_ui(df):
                 c2.write(row["Atributo"])
                 key = f"roll_skill_{bloco_tag}_{i}_{row[col_pericia]}"
                 if c3.button(str(row["Total"]), key=key, use_container_width=True):
-                    st.session_state["skill_last_output"] = (
-                        f"Perícia: {row[col_pericia]}",
-                        rolar_pericia(row[col_pericia], int(row["Total"]))
-                    )
+                    inv = Invocacao.pericia(row[col_pericia], int(row["Total"]))
+                    with metricas().medir("cast"):
+                        st.session_state["skill_last_output"] = (f"Perícia: {row[col_pericia]}", executar(inv))
+                    add_log(*st.session_state["skill_last_output"], invocacao=inv)
 
     render_bloco(col_esq, bloco_esq, "L")
     render_bloco(col_dir, bloco_dir, "R")
@@ -70,22 +104,48 @@ def pericias_ui(df):
 # Utilitários
 # ---------------------------
 
-def dado(faces: int, vezes: int = 1) -> list[int]:
-    """Rola 'vezes' dados de 'faces' e retorna a lista com os resultados."""
-    return [random.randint(1, faces) for _ in range(vezes)]
-
-def dado_cura_aprimorada(faces: int, vezes: int = 1) -> list[int]:
-    return [random.randint(3, faces) for _ in range(vezes)]
+def ativar_dados_sessao():
+    """
+    Usa o backend de dados da sessão (semente própria, ?seed=123 na URL reproduz a sessão).
+    Chamado no começo do script e de cada fragment, que podem rodar em outra thread.
+    """
+    if "backend_dados" not in st.session_state:
+        seed = st.query_params.get("seed")
+        st.session_state.backend_dados = BackendNumpy(seed=int(seed) if seed and seed.isdigit() else None)
+    usar_backend(st.session_state.backend_dados)
 
 def mod(atr: int) -> int:
     """Modificador de atributo: floor((atributo-10)/2)."""
     return (atr - 10) // 2
 
-def add_log(msg: str, payload: dict):
-    """Salva o resultado no histórico da sessão."""
+def sessao_id() -> str:
+    """Id da sessão do navegador (gerado na primeira rolagem)."""
+    if "sessao_id" not in st.session_state:
+        st.session_state.sessao_id = uuid.uuid4().hex
+    return st.session_state.sessao_id
+
+@st.cache_resource(show_spinner=False)
+def banco_rolagens() -> BancoRolagens:
+    """Log SQLite compartilhado por todas as sessões do processo."""
+    return BancoRolagens()
+
+@st.cache_resource(show_spinner=False)
+def feed_mesa() -> FeedMesa:
+    """Feed ao vivo compartilhado por todas as sessões do processo (ver feed_shoji)."""
+    return FeedMesa()
+
+def add_log(msg: str, payload: Resultado | dict, invocacao: Invocacao | None = None):
+    """
+    Salva o resultado no histórico da sessão (buffer com limite, ver historico_shoji), no SQLite e no feed da mesa.
+    invocacao: o que foi rolado; vai pro SQLite junto com a semente da sessão pra dar replay (ver replay_shoji).
+    """
     if "history" not in st.session_state:
-        st.session_state.history = []
-    st.session_state.history.insert(0, {"msg": msg, "payload": payload, "ts": datetime.now().strftime("%H:%M:%S")})
+        st.session_state.history = HistoricoRolagens(TAMANHO_HISTORICO, arquivo_spill_sessao(sessao_id()))
+        backend = st.session_state.backend_dados
+        banco_rolagens().registrar_sessao(sessao_id(), backend.seed, backend.tamanho_buffer)
+    st.session_state.history.adicionar(msg, payload)
+    banco_rolagens().registrar(sessao_id(), msg, payload, invocacao=None if invocacao is None else invocacao.as_dict())
+    feed_mesa().publicar(personagem.nome, msg, payload)
 
 def _pills(items):
     if not items: return ""
@@ -107,41 +167,46 @@ def _find_numeric_by_keywords(data: dict, keywords: tuple[str, ...]):
                     return k, v  # retorna a chave original e o valor
     return None, None
 
-def show_result(title: str, data: dict):
-    """Render amigável: decide o 'Resultado' de forma robusta."""
+def _resultado_principal_dict(data: dict):
+    """(rótulo, valor) do número grande pra payloads que ainda são dict soltos."""
     # 1) tenta pegar "dano"/"cura" em qualquer variação do nome
     key, val = _find_numeric_by_keywords(data, ("dano", "cura"))
-
     if key is not None:
-        primary_label = "Dano" if "dano" in key.lower() else "Cura"
-        primary_value = val
+        return ("Dano" if "dano" in key.lower() else "Cura"), val
+
+    # 2) fallback: soma rolagens + mods/bônus numéricos, se existirem
+    rolls = data.get("Rolagens") or data.get("rolagens") or []
+    total = sum(r for r in rolls if isinstance(r, (int, float)))
+
+    # procura campos numéricos que sejam modificadores/bônus
+    bonus = 0
+    for k, v in data.items():
+        if isinstance(v, (int, float)):
+            kl = k.lower()
+            if "mod" in kl or "bônus" in kl or "bonus" in kl:
+                bonus += v
+
+    if rolls:
+        return "Resultado", total + bonus
+    # 3) último recurso: mostra ataque/CD ou "-"
+    return "Resultado", (
+        data.get("Rolagem Acerto")
+        or data.get("Ataque")
+        or data.get("Acerto")
+        or data.get("Rolagem de Ataque")
+        or data.get("CD")
+        or "-"
+    )
+
+@metricas().medir("show_result")
+def show_result(title: str, data: Resultado | dict):
+    """Render amigável: decide o 'Resultado' de forma robusta."""
+    if isinstance(data, Resultado):
+        # Resultado já sabe qual é o número principal; o resto sai da visão em dict
+        primary_label, primary_value = data.resultado_principal()
+        data = data.as_dict()
     else:
-        # 2) fallback: soma rolagens + mods/bônus numéricos, se existirem
-        rolls = data.get("Rolagens") or data.get("rolagens") or []
-        total = sum(r for r in rolls if isinstance(r, (int, float)))
-
-        # procura campos numéricos que sejam modificadores/bônus
-        bonus = 0
-        for k, v in data.items():
-            if isinstance(v, (int, float)):
-                kl = k.lower()
-                if "mod" in kl or "bônus" in kl or "bonus" in kl:
-                    bonus += v
-
-        if rolls:
-            primary_label = "Resultado"
-            primary_value = total + bonus
-        else:
-            # 3) último recurso: mostra ataque/CD ou "-"
-            primary_label = "Resultado"
-            primary_value = (
-                data.get("Rolagem Acerto")
-                or data.get("Ataque")
-                or data.get("Acerto")
-                or data.get("Rolagem de Ataque")
-                or data.get("CD")
-                or "-"
-            )
+        primary_label, primary_value = _resultado_principal_dict(data)
 
     alcance = data.get("Alcance") or data.get("alcance")
     efeito  = data.get("Efeito") or data.get("efeito")
@@ -188,67 +253,45 @@ def show_result(title: str, data: dict):
             if cd_tr is not None:
                 st.metric("CD do TR", cd_tr)
 
-    add_log(title, data)
-
-# Utilitários rolagens shoji
-
-
-def _rola_extras(faces: int, n: int = 1):
-    # usa sua função dado(...) se existir; senão, usa random
-    if 'dado' in globals():
-        return dado(faces, n)  # sua assinatura parece ser dado(faces, quant)
-    import random
-    return [random.randint(1, faces) for _ in range(n)]
-
-def _add_bonus_ataque(res: dict, bonus: int):
-    # suas armas às vezes retornam "Rolagem de Ataque" ou "Ataque"
-    if "Rolagem de Ataque" in res:
-        res["Rolagem de Ataque"] = int(res["Rolagem de Ataque"]) + int(bonus)
-    else:
-        res["Ataque"] = int(res.get("Ataque", 0)) + int(bonus)
-
-def _append_rolagens(res: dict, novas_rols: list[int]):
-    if not novas_rols:
-        return
-    if "Rolagens" in res and isinstance(res["Rolagens"], list):
-        res["Rolagens"].extend(novas_rols)
-    else:
-        res["Rolagens"] = list(novas_rols)
-
 # ---------------------------
 # FICHA (base do usuário)
 # ---------------------------
+# Derivados (maestria, CA, CD, modificadores de CA/RD, perícias) num grafo por sessão:
+# cada rerun só recalcula os nós cujas entradas mudaram (ver derivados_shoji)
+@st.cache_resource(show_spinner=False, max_entries=32)
+def carregar_pericias_base(caminho: str, assinatura_csv: tuple, nivel: int, maestria: int, atributos: tuple, tabela: TabelaPericias) -> pd.DataFrame:
+    # assinatura_csv (mtime, tamanho) só entra na chave do cache; o df é compartilhado, não modificar
+    return calcular_pericias_base(caminho, nivel, maestria, atributos, tabela)
+
+if "derivados" not in st.session_state:
+    st.session_state.derivados = grafo_ficha(carregar_pericias_base)
+derivados = st.session_state.derivados
+derivados.limpar_recalculados()
+derivados.definir(personagem=personagem)
+
 # Ficha
-nivel = 6
+nivel = personagem.nivel
 
 # Atributos
-For = 20
-Des = 7
-Con = 18
-Int = 14
-Sab = 14
-Car = 8
+For = personagem.For
+Des = personagem.Des
+Con = personagem.Con
+Int = personagem.Int
+Sab = personagem.Sab
+Car = personagem.Car
 
 #Calcula Maestria =Int(SOMA(1+ARREDONDAR.PARA.CIMA(nivel/4)))
-maestria = math.ceil(1 + nivel/4)
-
-# calcula valor do atributo
-def mod(atr: int) -> int:
-    return (atr - 10) // 2
+maestria = derivados["maestria"]
 
 # Classe de Armadura
-CA_Natural = 10 
-Uniforme = 8
-Escudo = 0
-Outros = 10
-CA = (CA_Natural+Uniforme+Escudo+Outros) # mod des n aplicavel
-RD = 7
+CA = derivados["CA"] # mod des n aplicavel
+RD = personagem.rd
 
 # Pontos de Vida - Manual; Pontos de energia =5*nivel+N(mod sab)
-PV = 99
-PE = 39
-PE_maximo_armazenado = 70
-cd_do_tr = 10 + maestria + mod(Int) + 1 # não aplicável
+PV = personagem.pv
+PE = personagem.pe
+PE_maximo_armazenado = personagem.pe_maximo_armazenado
+cd_do_tr = derivados["cd_do_tr"] # não aplicável
 
 # ---------------------------
 # Habilidades (coringas)
@@ -256,267 +299,71 @@ cd_do_tr = 10 + maestria + mod(Int) + 1 # não aplicável
 
 # Estilo oculto adiciona o valor tanto em dano quanto na rolagem de ataque
 estilo_oculto = ['Nenhum','1º Fluxo','2º Fluxo', '3º Fluxo', '4º Fluxo', '5º Fluxo', '6º Fluxo', '7º Fluxo', '8º Fluxo', '9º Fluxo', '10ºFluxo']
-adicional_estilo_oculto = {
-     'Nenhum': 0,
-     '1º Fluxo': 1,
-     '2º Fluxo': 2,
-     '3º Fluxo': 3, 
-     '4º Fluxo': 4, 
-     '5º Fluxo': 5, 
-     '6º Fluxo': 6, 
-     '7º Fluxo': 7, 
-     '8º Fluxo': 8, 
-     '9º Fluxo': 9, 
-     '10ºFluxo': 10,
-}
-posturas = ['Nenhuma','Postura do Sol']
-# Nenhuma n faz nada
-#postura do sol adiciona mais um dado de dano e +2 no acerto
-postura_do_sol = {
-     "Acerto": 2,
-     "Dano": 1234, #Precisa pegar qual o dado de dano da arma (mudar)
-}
+posturas = list(nucleo.posturas)
 
 kukan = ['Nenhum','Kukan no Kyoka', 'Kukan no Kyoka - Ritual']
-adicional_kukan = {
-     'Nenhum': 0,
-     'Kukan no Kyoka': 7,
-     'Kukan no Kyoka - Ritual': 16,
-}
-armas = [
-'Espada Gancho (G 4)',
-'Espada Dupla (G 4)',
-'Espada Colossal (G 4)',
-'Nunchako Pesado (G 4)',
-'Lança Grande (G 4)',
-'Machado Grande (G 4)',
-'Foice Grande (G 4) Afiada',
-'Soqueira (G 4)(Aç.B. TP 6m 1PE)',
-'Cardume de Adagas (G 3)',
-'Adaga de Aparar (G 4)',
-]
-
-cast_arma_escolhida = {
-     'Espada Gancho (G 4)': aa.espada_gancho,
-     'Espada Dupla (G 4)': aa.espada_dupla,
-     'Espada Colossal (G 4)': aa.espada_colossal,
-     'Nunchako Pesado (G 4)': aa.nunchako_pesado,
-     'Lança Grande (G 4)': aa.lanca_grande,
-     'Machado Grande (G 4)': aa.machado_grande,
-     'Foice Grande (G 4) Afiada': aa.foice_grande,
-     'Soqueira (G 4)(Aç.B. TP 6m 1PE)': aa.soqueira,
-     'Cardume de Adagas (G 3)': aa.cardume_de_adagas,
-     'Adaga de Aparar (G 4)': aa.adaga_de_aparar,
-}
-
-arma_dano_faces = {
-    'Espada Gancho (G 4)': 8,    # no seu código da espada gancho, vi d8
-    'Espada Dupla (G 4)': 8,
-    'Espada Colossal (G 4)': 12,
-    'Nunchako Pesado (G 4)': 6,
-    'Lança Grande (G 4)': 10,
-    'Machado Grande (G 4)': 12,
-    'Foice Grande (G 4) Afiada': 10,
-    'Soqueira (G 4)(Aç.B. TP 6m 1PE)': 4,
-    'Cardume de Adagas (G 3)': 4,
-    'Adaga de Aparar (G 4)': 4,
-}
+armas = list(personagem.armas)
 
 def toggle_vantagem(default=False) -> bool:
-    return st.checkbox(label='Vantagem (ainda n funciona)',
+    return st.checkbox(label='Vantagem',
                        key='vantagem_atual',
                        value=default)
-def cast_ataque_armado():
-    vantagem = vantagem_atual
-    arma = arma_atual
-    postura = postura_atual
-    estilo = estilo_oculto_atual
-    kukan_no_kyoka = kukan_no_kyoka_atual
-
-    # 1) bônus do estilo oculto e kukan no kyoka (mesmo valor em ataque e dano)
-    bonus_estilo = adicional_estilo_oculto.get(estilo, 0)
-    bonus_kukan = adicional_kukan.get(kukan_no_kyoka, 0)
-    bonus_ataque = bonus_estilo+bonus_kukan
-    bonus_dano_flat = bonus_estilo
-
-    # 2) postura
-    dados_extras = 0
-    if postura == 'Postura do Sol':
-        bonus_ataque += 2
-        dados_extras = 1  # +1 dado do mesmo tipo da arma
-
-    # 3) executa o ataque base da arma
-    func = cast_arma_escolhida.get(arma)
-    if not func:
-        raise ValueError(f"Arma desconhecida: {arma}")
-    res = func()  # retorna o dicionário da sua arma (acerto, rolags, dano, etc.)
-
-    # 4) aplica bônus no ACERTO
-    _add_bonus_ataque(res, bonus_ataque)
-
-    # 5) aplica bônus no DANO e os dados extras (se houver)
-    faces = arma_dano_faces.get(arma)
-    extras = _rola_extras(faces, dados_extras) if (dados_extras and faces) else []
-    res["Dano"] = int(res.get("Dano", 0)) + int(bonus_dano_flat) + sum(extras)
-    _append_rolagens(res, extras)
-
-    # 6) metadados úteis para debug/UI
-    res["Arma"] = arma
-    res["Postura"] = postura
-    res["Estilo Oculto"] = estilo
-    res["Bônus Estilo (ataque/dano)"] = bonus_estilo
-    res['Kukan no Kyoka'] = bonus_kukan
-    if postura == 'Postura do Sol':
-        res["Bônus Postura (ataque)"] = 2
-        res["Dados extras de dano"] = f"+1d{faces}" if faces else "+1 dado (definir faces)"
-
-    return res
-
-def cast_execucao_silenciosa():
-    """Execução Silenciosa: rola ataque armado + dano extra 1d8 (+1d8 a cada 4 níveis)."""
-    # 1) pega o ataque normal
-    base_res = cast_ataque_armado()
-
-    # 2) quantidade de d8 extras (mínimo 1)
-    dados_extra = (nivel // 4) + 1
-    extras = _rola_extras(8, dados_extra)
-
-    # 3) aplica os dados extras no resultado
-    base_res["Dano"] += sum(extras)
-    _append_rolagens(base_res, extras)
-
-    # 4) marca no log
-    base_res["Habilidade"] = f"{base_res['Habilidade']} + Execução Silenciosa"
-    base_res["Descrição Extra"] = f"Execução Silenciosa: +{dados_extra}d8 de dano."
-
-    return base_res
-
-def cast_corte_oculto():
-    """
-    Corte Oculto:
-      - Base: cast_ataque_armado()
-      - +1 dado da arma + FOR
-      - Se for CRIT, o +1 dado entra no cálculo do crítico (vira +2 dados no resultado final).
-        (crit atual x6 => regra efetiva já aplicada na função base; aqui apenas ajustamos os dados extras)
-    """
-    res = cast_ataque_armado()
-
-    arma = res.get("Arma") or arma_atual
-    faces = arma_dano_faces.get(arma)
-    if not faces:
-        # se não souber as faces, não dá pra rolar dado extra corretamente
-        res["Descrição Extra"] = (res.get("Descrição Extra", "") + " | Corte Oculto: definir faces do dado da arma.").strip(" |")
-        return res
-
-    # detecta CRIT pelo texto (seu retorno tem "(CRIT)" na descrição)
-    desc = (res.get("Descrição") or res.get("Descricao") or "").upper()
-    is_crit = "CRIT" in desc
-
-    # +1d<faces> (normal) ou +2d<faces> (se CRIT, pq entra dentro do cálculo do crítico)
-    dados_extras = 2 if is_crit else 1
-    extras = _rola_extras(faces, dados_extras)
-
-    # bônus de FOR (flat, não multiplicado)
-    for_bonus = 0
-    try:
-        for_bonus = mod(For)  # se você já tiver mod(For) no escopo
-    except Exception:
-        for_bonus = globals().get("mod_for", 0)
-
-    # aplica no resultado
-    res["Dano"] = int(res.get("Dano", 0)) + sum(extras) + int(for_bonus)
-    _append_rolagens(res, extras)
-
-    # marca metadados
-    res["Habilidade"] = f"{res.get('Habilidade','Ataque')} + Corte Oculto"
-    add_txt = f"Corte Oculto: +{dados_extras}d{faces} {'(crit)' if is_crit else ''} + FOR({for_bonus})."
-    res["Descrição Extra"] = (res.get("Descrição Extra", "") + (" | " if res.get("Descrição Extra") else "") + add_txt)
-
-    return res
-
-def cast_corte_oculto_ritual():
-    """
-    Corte Oculto:
-      - Base: cast_ataque_armado()
-      - +3 dado da arma + FOR
-      - Se for CRIT, o +3 dado entra no cálculo do crítico (vira +6 dados no resultado final).
-        (crit atual x6 => regra efetiva já aplicada na função base; aqui apenas ajustamos os dados extras)
-    """
-    res = cast_ataque_armado()
-
-    arma = res.get("Arma") or arma_atual
-    faces = arma_dano_faces.get(arma)
-    if not faces:
-        # se não souber as faces, não dá pra rolar dado extra corretamente
-        res["Descrição Extra"] = (res.get("Descrição Extra", "") + " | Corte Oculto: definir faces do dado da arma.").strip(" |")
-        return res
-
-    # detecta CRIT pelo texto (seu retorno tem "(CRIT)" na descrição)
-    desc = (res.get("Descrição") or res.get("Descricao") or "").upper()
-    is_crit = "CRIT" in desc
-
-    # +1d<faces> (normal) ou +2d<faces> (se CRIT, pq entra dentro do cálculo do crítico)
-    dados_extras = 6 if is_crit else 3
-    extras = _rola_extras(faces, dados_extras)
-
-    # bônus de FOR (flat, não multiplicado)
-    for_bonus = 0
-    try:
-        for_bonus = mod(For)  # se você já tiver mod(For) no escopo
-    except Exception:
-        for_bonus = globals().get("mod_for", 0)
-
-    # aplica no resultado
-    res["Dano"] = int(res.get("Dano", 0)) + sum(extras) + int(for_bonus)
-    _append_rolagens(res, extras)
-
-    # marca metadados
-    res["Habilidade"] = f"{res.get('Habilidade','Ataque')} + Corte Oculto"
-    add_txt = f"Corte Oculto: +{dados_extras}d{faces} {'(crit)' if is_crit else ''} + FOR({for_bonus})."
-    res["Descrição Extra"] = (res.get("Descrição Extra", "") + (" | " if res.get("Descrição Extra") else "") + add_txt)
-
-    return res
-
-def cast_convergencia():
-	rols = dado(8, 3)
-	return {
-	"Habilidade": "Convergência, 血を流す",
-    "Custo": 1,
-	"Alcance": "12m",
-	"CD do TR": cd_do_tr,
-    "Descrição": "Converge legal",
-	"Rolagens": rols,
-	"Dano (3d8)": sum(rols)+mod(Int),
-	}
+def build_atual() -> Build:
+    """Build com o que está selecionado nos widgets (as regras ficam no nucleo_shoji)."""
+    return Build(
+        arma=arma_atual,
+        postura=postura_atual,
+        estilo=estilo_oculto_atual,
+        kukan=kukan_no_kyoka_atual,
+        vantagem=vantagem_atual,
+        golpe_descendente=golpe_descendente_atual,
+        guarda=guarda_atual,
+        gp_elemental=gp_elemental_atual,
+        gp_letal=gp_letal_atual,
+        gp_preciso=gp_preciso_atual,
+        nivel=nivel,
+        For=For,
+    )
 
 # ---------------------------
 # LAYOUT
 # ---------------------------
 
+ativar_dados_sessao()
+
 # ----- Colunas principais
 col_ficha, col_pericias, col_habs = st.columns([2, 3, 2], gap="large")
 
-st.sidebar.title('Shoji Yoshiro')
-st.sidebar.image('shoji.png')
-st.sidebar.subheader('Quem é O Homem?')
-st.sidebar.write('Shoji é o cara que bate na cara de piranha, corta carros ao meio e os krl.')
-st.sidebar.write('')
-st.sidebar.write('O literal maior assassino do mundo Jujutsu.')
+if len(ids_personagens) > 1:
+    escolhido = st.sidebar.selectbox('Personagem', ids_personagens, index=ids_personagens.index(personagem_id))
+    if escolhido != personagem_id:
+        st.query_params["personagem"] = escolhido
+        st.rerun()
+
+st.sidebar.title(personagem.nome)
+if personagem.imagem:
+    with metricas().medir("sidebar_imagem"):
+        st.sidebar.image(personagem.imagem)
+if personagem.subtitulo:
+    st.sidebar.subheader(personagem.subtitulo)
+for linha in personagem.descricao:
+    st.sidebar.write(linha)
+st.sidebar.caption(f'🎲 Semente dos dados: {st.session_state.backend_dados.seed}')
 st.sidebar.markdown('---')
 
 # Golpe Pessoal
-st.sidebar.title('Golpe Pessoal (ainda n funciona)')
+st.sidebar.title('Golpe Pessoal')
 def gp_elemental(default=False):
-    return st.checkbox(label='Elemental (3PE, +3d6)',
+    return st.checkbox(label=f'Elemental ({nucleo.CUSTO_GP_ELEMENTAL}PE, +3d6)',
                        key='gp_elemental_atual',
                        value=default)
 
 def gp_letal(default=False):
-    return st.checkbox(label='Letal (2PE, +2 margem de ameaça)',
+    return st.checkbox(label=f'Letal ({nucleo.CUSTO_GP_LETAL}PE, +2 margem de ameaça)',
                        key='gp_letal_atual',
                        value=default)
 def gp_preciso(default=False):
-    return st.checkbox(label='Preciso (1PE/2PE segundo uso adiante, vantagem)',
+    return st.checkbox(label='Preciso ({}PE/{}PE segundo uso adiante, vantagem)'.format(*nucleo.CUSTO_GP_PRECISO),
                        key='gp_preciso_atual',
                        value=default)
 with st.sidebar:
@@ -587,6 +434,107 @@ def select_rd_outros(default: int = 0, min_value: int = -50, max_value: int = 50
         format="%d",
     )
 
+@st.cache_data(show_spinner=False, max_entries=64)
+def ranking_builds(ca_alvo: int, base: Build, so_nao_dominados: bool, armas: tuple):
+    return otimizar_build(ca_alvo, base, so_nao_dominados, armas)
+
+@st.cache_resource(show_spinner=False, max_entries=128)
+def grafico_distribuicao(plano: nucleo.PlanoAtaque, ca_alvo: int | None):
+    """Resumo + histograma (normal/crit/erro empilhados) + CDF do plano. Cache por plano compilado e CA."""
+    dist = distribuicao_plano(plano, ca_alvo)
+    dano = np.arange(len(dist.pmf))
+    erro = np.zeros(len(dist.pmf))
+    erro[0] = 1.0 - dist.p_acerto
+    partes = pd.DataFrame({
+        "Dano": np.tile(dano, 3),
+        "Probabilidade": np.concatenate([dist.normal, dist.crit, erro]),
+        "Parte": np.repeat(["Normal", "Crit", "Errou"], len(dano)),
+    })
+    partes = partes[partes["Probabilidade"] > 0]
+    barras = alt.Chart(partes).mark_bar().encode(
+        x=alt.X("Dano:Q"),
+        y=alt.Y("Probabilidade:Q", stack=True, axis=alt.Axis(format="%")),
+        color=alt.Color("Parte:N", sort=["Normal", "Crit", "Errou"]),
+        tooltip=["Dano", "Parte", alt.Tooltip("Probabilidade:Q", format=".2%")],
+    ).properties(height=220)
+    cdf = alt.Chart(pd.DataFrame({"Dano": dano, "P(dano ≤ x)": dist.cdf()})).mark_line(interpolate="step-after").encode(
+        x="Dano:Q",
+        y=alt.Y("P(dano ≤ x):Q", axis=alt.Axis(format="%")),
+    ).properties(height=160)
+    return dist.resumo(), barras, cdf
+
+# ----- Painéis de rolagem (st.fragment: clicar num botão só reroda o próprio painel)
+@st.fragment
+def painel_habilidades():
+    ativar_dados_sessao()
+    st.subheader('Habilidades')
+
+    # --- botões (apenas definem o 'clicked')
+    c1, c2 = st.columns(2)
+    c3, c4 = st.columns(2)
+#    c5, c6 = st.columns(2)
+
+    clicked = None  # (título, habilidade do nucleo_shoji)
+    if c1.button(emoji_ataque_armado.get(arma_atual, "⚔️")+" Ataque Armado", use_container_width=True):
+        clicked = ("Ataque Armado", "Ataque Armado")
+    if c2.button("🤫 Execução Silenciosa", use_container_width=True):
+        clicked = ("Execução Silenciosa", "Execução Silenciosa")
+    if c3.button("🌀 Corte Oculto", use_container_width=True):
+        clicked = ("Corte Oculto", "Corte Oculto")
+    if c4.button("🌀 Corte Oculto - Ritual", use_container_width=True):
+        clicked = ("Corte Oculto - Ritual (Ação completa)", "Corte Oculto - Ritual")
+#    if c5.button("Placeholder 2", use_container_width=True):
+#        clicked = ("Turbilhão de Sangue", cast_turbilhao_de_sangue())
+#    if c6.button("Placeholder 3", use_container_width=True):
+#        clicked = ("Turbilhão de Sangue - Sangramento", cast_sangramento())
+
+    # rola o que foi clicado, salva o último output (e registra no histórico só uma vez)
+    if clicked:
+        titulo, habilidade = clicked
+        inv = Invocacao.habilidade(habilidade, build_atual())
+        with metricas().medir("cast"):
+            st.session_state["last_output"] = (titulo, executar(inv))
+        add_log(*st.session_state["last_output"], invocacao=inv)
+
+    # --- render fixo do output (sempre abaixo do '---')
+    if "last_output" in st.session_state:
+        title, payload = st.session_state["last_output"]
+        show_result(title, payload)
+    else:
+        st.caption("Clique numa habilidade para rolar.")
+
+@st.fragment(run_every=INTERVALO_FEED)
+def painel_mesa(n: int = 15):
+    """Rolagens de todo mundo: a cada INTERVALO_FEED s busca só o que veio depois do último id visto."""
+    if "feed_recentes" not in st.session_state:
+        st.session_state.feed_recentes = deque(maxlen=n)
+        st.session_state.feed_cursor = 0
+    novos = feed_mesa().desde(st.session_state.feed_cursor, limite=n)
+    if novos:
+        st.session_state.feed_recentes.extend(novos)
+        st.session_state.feed_cursor = novos[-1]["id"]
+
+    if not st.session_state.feed_recentes:
+        st.caption("Ninguém rolou nada ainda.")
+    for item in reversed(st.session_state.feed_recentes):
+        hora = datetime.fromtimestamp(item["ts"]).strftime("%H:%M:%S")
+        rotulo, valor = _resultado_principal_dict(item["payload"])
+        st.markdown(f"`{hora}` **{escape(item['autor'])}** · {escape(item['msg'])} → {escape(rotulo)} **{escape(str(valor))}**")
+
+@st.fragment
+def painel_pericias(df, slot_resultado):
+    ativar_dados_sessao()
+    pericias_ui(df)
+
+    # o card do resultado fica na coluna de habilidades, num st.empty criado lá
+    with slot_resultado.container():
+        if "skill_last_output" in st.session_state:
+            title, payload = st.session_state["skill_last_output"]
+            show_result(title, payload)
+        else:
+            st.caption("Clique no valor Total para rolar a perícia.")
+
+inicio_widgets = time.perf_counter()
 with col_pericias:
     per1, per2, per3 = st.columns([3,2,2])
     with per1:
@@ -622,93 +570,50 @@ with col_habs:
         guarda_atual = toggle_erguer_guarda(default=False)
 #    with b32:
 #        kukan_no_kyoka_atual = escolher_kukan_no_kyoka(kukan)
-    
-    st.subheader('Habilidades')
-
-    # --- botões (apenas definem o 'clicked')
-    c1, c2 = st.columns(2)
-    c3, c4 = st.columns(2)
-#    c5, c6 = st.columns(2)
-
-    clicked = None
-    if c1.button(emoji_ataque_armado.get(arma_atual)+" Ataque Armado", use_container_width=True):
-        clicked = ("Ataque Armado", cast_ataque_armado())
-    if c2.button("🤫 Execução Silenciosa", use_container_width=True):
-        clicked = ("Execução Silenciosa", cast_execucao_silenciosa())
-    if c3.button("🌀 Corte Oculto", use_container_width=True):
-        clicked = ("Corte Oculto", cast_corte_oculto())
-    if c4.button("🌀 Corte Oculto - Ritual", use_container_width=True):
-        clicked = ("Corte Oculto - Ritual (Ação completa)", cast_corte_oculto_ritual())
-#    if c5.button("Placeholder 2", use_container_width=True):
-#        clicked = ("Turbilhão de Sangue", cast_turbilhao_de_sangue())
-#    if c6.button("Placeholder 3", use_container_width=True):
-#        clicked = ("Turbilhão de Sangue - Sangramento", cast_sangramento())
-
-    # salva o último output clicado
-    if clicked:
-        st.session_state["last_output"] = clicked
-
-    # --- render fixo do output (sempre abaixo do '---')
-    if "last_output" in st.session_state:
-        title, payload = st.session_state["last_output"]
-        show_result(title, payload)
-    else:
-        st.caption("Clique numa habilidade para rolar.")
+    metricas().registrar("widgets", (time.perf_counter() - inicio_widgets) * 1000)
+
+    painel_habilidades()
+
+    with st.expander("📊 Distribuição de dano", expanded=False):
+        d1, d2 = st.columns(2)
+        with d1:
+            habilidade_dist = st.selectbox("Habilidade", list(nucleo.etapas_habilidade), key="dist_habilidade")
+        with d2:
+            ca_dist = st.number_input("CA do alvo (0 = sempre acerta)", min_value=0, max_value=80, value=0, step=1, key="dist_ca_alvo")
+        resumo_dist, barras_dist, cdf_dist = grafico_distribuicao(
+            nucleo.compilar_plano(habilidade_dist, build_atual()), int(ca_dist) or None,
+        )
+        st.caption(" · ".join(f"{k}: {v:.0%}" if k.startswith("Chance") else f"{k}: {v}" for k, v in resumo_dist.items()))
+        st.altair_chart(barras_dist, use_container_width=True)
+        st.altair_chart(cdf_dist, use_container_width=True)
 
     st.markdown("---")
 
     st.subheader("Perícias")
-    # Resultado fixo acima da tabela
-    if "skill_last_output" in st.session_state:
-        title, payload = st.session_state["skill_last_output"]
-        show_result(title, payload)
-    else:
-        st.caption("Clique no valor Total para rolar a perícia.")
-
-
-#def modificadores_ca(modificador_ca) -> int:
-def mod_ca_golpe_descendente() -> int:
-    if golpe_descendente_atual is True:
-        return maestria
-    else:
-        return 0
-    
-def mod_ca_postura() -> int:
-    if postura_atual == 'Postura do Sol':
-        return -4
-    else:
-        return 0
-    
-modificadores_ca = mod_ca_golpe_descendente() + mod_ca_postura() + ca_outros_atual
-
-def mod_rd_adagas() -> int:
-    if arma_atual == 'Cardume de Adagas (G 3)':
-        return 4*maestria
-    elif arma_atual == 'Adaga de Aparar (G 4)':
-        return 4*maestria
-    else:
-        return 0
-    
-acerto_armas = {
-    'Espada Gancho (G 4)': 18,
-    'Espada Dupla (G 4)': 19,
-    'Espada Colossal (G 4)': 18,
-    'Nunchako Pesado (G 4)': 16,
-    'Lança Grande (G 4)': 16,
-    'Machado Grande (G 4)': 16,
-    'Foice Grande (G 4) Afiada': 16,
-    'Soqueira (G 4)(Aç.B. TP 6m 1PE)': 16,
-    'Cardume de Adagas (G 3)': 16,
-    'Adaga de Aparar (G 4)': 16,    
-}
+    # Resultado fixo acima da tabela (preenchido pelo painel_pericias)
+    slot_pericia = st.empty()
 
-def mod_rd_guarda() -> int:
-    if guarda_atual is True:
-        return acerto_armas.get(arma_atual) + (nivel//2) + adicional_kukan.get(kukan_no_kyoka_atual)
-    else:
-        return 0
-
-modificadores_rd = mod_rd_adagas()+mod_rd_guarda()+rd_outros_atual
+    st.markdown("---")
+    with st.expander("🏆 Melhor build contra uma CA", expanded=False):
+        ca_alvo = st.number_input("CA do alvo", min_value=0, max_value=80, value=30, step=1, key="otimizador_ca_alvo")
+        so_nao_dominadas = st.checkbox("Esconder combinações dominadas", value=True, key="otimizador_so_nao_dominadas")
+        # só o que o otimizador não varia (vantagem, Golpe Pessoal, guarda, nível, FOR) entra na chave do cache
+        base = replace(build_atual(), arma=armas[0], postura='Nenhuma', estilo='Nenhum', kukan='Nenhum')
+        ranking = ranking_builds(int(ca_alvo), base, so_nao_dominadas, personagem.armas)
+        st.dataframe(ranking.head(15), hide_index=True, use_container_width=True)
+
+
+derivados.definir(
+    arma=arma_atual,
+    postura=postura_atual,
+    kukan=kukan_no_kyoka_atual,
+    golpe_descendente=golpe_descendente_atual,
+    guarda=guarda_atual,
+    ca_outros=ca_outros_atual,
+    rd_outros=rd_outros_atual,
+)
+modificadores_ca = derivados["modificadores_ca"]
+modificadores_rd = derivados["modificadores_rd"]
 # ----- Coluna Ficha (sidebar visual)
 with col_ficha:
     st.subheader("📜 Ficha do Personagem")
@@ -722,6 +627,12 @@ with col_ficha:
         c2.metric("PE", PE)
         c3.metric("PE Maximo (Armazenado)", PE_maximo_armazenado)
 
+        # trocou de personagem na mesma sessão: recursos voltam pro máximo da nova ficha
+        if st.session_state.get("personagem_carregado") != personagem.id:
+            for chave in ("pv_atual", "pe_atual", "pe_armazenado_atual"):
+                st.session_state.pop(chave, None)
+            st.session_state.personagem_carregado = personagem.id
+
         # estado inicial (iguais ao máximo)
         if "pv_atual" not in st.session_state:
             st.session_state.pv_atual = PV
@@ -746,85 +657,76 @@ with col_ficha:
         a2.write(f"**Sab**: {Sab} ({mod(Sab):+d})")
         a2.write(f"**Car**: {Car} ({mod(Car):+d})")
     st.markdown("### 🧾 Histórico")
-    
+    inicio_historico = time.perf_counter()
+
     if "history" in st.session_state and st.session_state.history:
-        for item in st.session_state.history[:10]:
+        for item in st.session_state.history.recentes(10):
             with st.expander(f"[{item['ts']}] {item['msg']}", expanded=False):
-                st.json(item["payload"], expanded=False)
+                st.json(como_dict(item["payload"]), expanded=False)
     else:
         st.caption("Sem rolagens ainda. Lance uma habilidade!")
 
-
-
-# Perícias - ETL
-df = pd.read_csv('pericias.csv')
-
-
-
-# Perícias com Maestria
-per_com_maestria = ['Atletismo', 'Luta', 'Pontaria','Fortitude', 'Integridade','Percepção', 'Vontade','Astúcia', 'Feitiçaria', 'Ferreiro', 'Artesão']
-per_com_especializacao = ['Fortitude', 'Feitiçaria', 'Ferreiro']
-per_outrosmenos6 = -6
-per_com_outrosmenos6 = ['Furtividade']
-per_outrosmenos4 = -4
-per_com_outrosmenos4 = ['Reflexos']
-per_outrosmenos2 = -2
-per_com_outrosmenos2 = ['Acrobacia', 'Prestidigitação']
-per_outros2 = 2
-per_com_outros2 = ['Fortitude', 'Feitiçaria', 'Pontaria']
-per_outros4 = 4
-per_com_outros4 = ['Atletismo', 'Luta']
-per_outros6 = 6
-per_com_outros6 = ['Artesão']
-per_outros7 = 7
-per_com_outros7 = ['Ferreiro']
-per_kukan = adicional_kukan.get(kukan_no_kyoka_atual, 0)
-per_com_kukan = ['Luta']
+    with st.expander("📚 Histórico salvo", expanded=False):
+        todas = st.checkbox("Todas as sessões", key="historico_todas_sessoes")
+        filtro_sessao = None if todas else sessao_id()
+        total_salvo = banco_rolagens().contar(sessao=filtro_sessao)
+        por_pagina = 10
+        n_paginas = max((total_salvo + por_pagina - 1) // por_pagina, 1)
+        pagina = st.number_input(f"Página (de {n_paginas})", min_value=1, max_value=n_paginas, step=1, key="historico_pagina")
+        for item in banco_rolagens().pagina(int(pagina) - 1, por_pagina, sessao=filtro_sessao):
+            hora = datetime.fromtimestamp(item["ts"]).strftime("%d/%m %H:%M:%S")
+            st.markdown(f"**[{hora}] {escape(item['msg'])}** · #{item['id']}")
+            st.json(item["payload"], expanded=False)
+        if total_salvo:
+            st.caption(f"Refazer uma rolagem: `python replay_shoji.py {filtro_sessao or '<sessao>'} --rolagem <id>`")
+    metricas().registrar("historico", (time.perf_counter() - inicio_historico) * 1000)
+
+    st.markdown("### 🎲 Mesa (ao vivo)")
+    painel_mesa()
+
+
+
+# Perícias - ETL (nó "pericias" do grafo: o csv só é relido se ele mudar ou se nível/atributos mudarem,
+# o Kukan só soma a coluna dele)
+with metricas().medir("pericias_etl"):
+    stat_pericias = os.stat(personagem.csv_pericias)
+    derivados.definir(assinatura_pericias=(stat_pericias.st_mtime_ns, stat_pericias.st_size))
+    df = derivados["pericias"]
 
 #st.sidebar.subheader('Debugging')
 #st.sidebar.write(per_kukan)
 
-# 1) mapa tolerante de rótulos de atributo -> modificador
-attr_mod_map = {
-    "for": mod(For), "força": mod(For), "forca": mod(For), "str": mod(For),
-    "des": mod(Des), "dex": mod(Des), "destreza": mod(Des),
-    "con": mod(Con), "constituição": mod(Con), "constituicao": mod(Con),
-    "int": mod(Int), "inteligência": mod(Int), "inteligencia": mod(Int),
-    "sab": mod(Sab), "sabedoria": mod(Sab),
-    "car": mod(Car), "carisma": mod(Car),
-}
-
-# 2) normaliza nomes de colunas (com ou sem acento)
-col_pericia = "Pericia" if "Pericia" in df.columns else "Pericia"
-
-# 3) componentes
-df["ModAtrib"] = df["Atributo"].map(lambda s: attr_mod_map.get(str(s).strip().lower(), 0))
-df["LvlHalf"]  = nivel // 2
-df["Maestria"] = np.where(df[col_pericia].isin(per_com_maestria), maestria, 0)
-df['Especializacao'] = np.where(df[col_pericia].isin(per_com_especializacao), maestria//2, 0)
-df["Outros2"]   = np.where(df[col_pericia].isin(per_com_outros2), per_outros2, 0)
-df["Outros4"]   = np.where(df[col_pericia].isin(per_com_outros4), per_outros4, 0)
-df["Outros6"]   = np.where(df[col_pericia].isin(per_com_outros6), per_outros6, 0)
-df["Outros7"]   = np.where(df[col_pericia].isin(per_com_outros7), per_outros7, 0)
-df["Kukan"]     = np.where(df[col_pericia].isin(per_com_kukan), per_kukan, 0)
-df["Outrosmenos6"]   = np.where(df[col_pericia].isin(per_com_outrosmenos6), per_outrosmenos6, 0)
-df["Outrosmenos4"]   = np.where(df[col_pericia].isin(per_com_outrosmenos4), per_outrosmenos4, 0)
-df["Outrosmenos2"]   = np.where(df[col_pericia].isin(per_com_outrosmenos2), per_outrosmenos2, 0)
-
-
-# 4) total final
-df["Total"] = df["ModAtrib"] + df["LvlHalf"] + df["Maestria"] + df['Especializacao'] + df["Outros2"] + df["Outros4"] + df["Outros6"] + df["Outros7"]+ df["Outrosmenos6"]+ df["Outrosmenos4"]+ df["Outrosmenos2"]+df['Kukan']
-
 
 # ----- Col Pericias
 with col_pericias:
-    pericias_ui(df)
+    painel_pericias(df, slot_pericia)
+
+    with st.expander("🎯 Chance de passar no teste", expanded=False):
+        t1, t2, t3 = st.columns([3, 2, 2])
+        with t1:
+            pericia_teste = st.selectbox("Perícia", df["Pericia"], key="teste_pericia")
+        with t2:
+            cd_teste = st.number_input("CD", min_value=1, max_value=60, value=15, step=1, key="teste_cd")
+        with t3:
+            vantagem_teste = st.checkbox("Com vantagem", value=False, key="teste_vantagem")
+        total_teste = int(df.loc[df["Pericia"] == pericia_teste, "Total"].iloc[0])
+        st.metric(f"{pericia_teste} ({total_teste:+d}) contra CD {cd_teste}",
+                  f"{chance_sucesso(total_teste, int(cd_teste), vantagem_teste):.0%}")
+        st.dataframe(matriz_sucesso(df, vantagem_teste).style.format("{:.0%}"), use_container_width=True)
 
 
 #st.sidebar.write('arma atual: '+str(arma_atual))
-#st.sidebar.write('adicional kukan: '+str(adicional_kukan.get(kukan_no_kyoka_atual)))
-#st.sidebar.write('acerto armas: '+str(acerto_armas.get(arma_atual)))
-#st.sidebar.write('mod rd guarda: '+str(mod_rd_guarda()))
+#st.sidebar.write('mod rd guarda: '+str(nucleo.mod_rd_guarda(build_atual())))
 #st.sidebar.write(golpe_descendente_atual)
 #st.sidebar.write('CA atual abaixo')
 #st.sidebar.write(CA+modificadores_ca)
+
+# ---------------------------
+# Tempos do rerun (painel de debug + exportação)
+# ---------------------------
+metricas().registrar("rerun", (time.perf_counter() - inicio_rerun) * 1000)
+if modo_debug:
+    with st.sidebar.expander("⏱️ Tempos por fase (ms)", expanded=True):
+        st.dataframe(pd.DataFrame.from_dict(metricas().resumo(), orient="index"), use_container_width=True)
+        st.caption("Recalculados neste rerun: " + (", ".join(derivados.recalculados) or "nada"))
+metricas().exportar()
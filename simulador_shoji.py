@@ -0,0 +1,192 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+from ataques_shoji import dado
+from dados_shoji import BackendNumpy, usar_backend
+import nucleo_shoji as nucleo
+from nucleo_shoji import Build
+from personagens_shoji import Personagem, RegistroPersonagens
+
+# ---------------------------
+# Simulador de encontros (várias rodadas, vários inimigos, em paralelo)
+# ---------------------------
+# Cada encontro: o personagem usa 'habilidade' todo turno no primeiro inimigo vivo,
+# os inimigos atacam de volta contra CA/RD da ficha (com os modificadores do build).
+# Os encontros são divididos em lotes e rodam num ProcessPoolExecutor; cada lote tem
+# sua semente (SeedSequence.spawn), então a mesma semente reproduz a simulação inteira.
+
+@dataclass(frozen=True)
+class Inimigo:
+    nome: str = "Inimigo"
+    pv: int = 100
+    ca: int = 25
+    rd: int = 0
+    ataque: int = 10                           # bônus no d20
+    dano: tuple[int, int, int] = (8, 2, 5)     # (faces, quantidade, bônus fixo)
+    ataques_por_rodada: int = 1
+
+@dataclass(frozen=True)
+class ConfigEncontro:
+    # custo em PE de cada habilidade usada (sem padrão: os números são da mesa). Precisa ter a 'habilidade'
+    # e o 'Ataque Armado', pra onde o personagem cai quando falta PE. O Golpe Pessoal é cobrado à parte (nucleo).
+    custos_pe: dict
+    habilidade: str = 'Ataque Armado'
+    max_rodadas: int = 100
+
+    def __post_init__(self):
+        if self.max_rodadas < 1:
+            raise ValueError(f"max_rodadas precisa ser >= 1: {self.max_rodadas}")
+        if self.habilidade not in nucleo.etapas_habilidade:
+            raise ValueError(f"Habilidade desconhecida: {self.habilidade}")
+        faltando = [h for h in dict.fromkeys((self.habilidade, 'Ataque Armado')) if h not in self.custos_pe]
+        if faltando:
+            raise ValueError(f"Sem custo em PE para: {', '.join(faltando)} (--custo \"HABILIDADE=PE\" na linha de comando)")
+
+def _escolher_ataque(build: Build, config: ConfigEncontro, pe: int, usos_preciso: int):
+    """(habilidade, build, custo) do turno: a habilidade com o Golpe Pessoal, senão o Ataque Armado com ele, senão sem ele."""
+    for habilidade, b in ((config.habilidade, build), ('Ataque Armado', build),
+                          ('Ataque Armado', nucleo.sem_golpe_pessoal(build))):
+        custo = config.custos_pe[habilidade] + nucleo.custo_golpe_pessoal(b, usos_preciso)
+        if custo <= pe:
+            return habilidade, b, custo
+    return None, None, 0  # nem o Ataque Armado cabe no PE: perde o turno
+
+def simular_encontro(personagem: Personagem, build: Build, inimigos: list[Inimigo], config: ConfigEncontro) -> dict:
+    """Roda um encontro com o backend de dados ativo e devolve o resumo dele."""
+    if not inimigos:
+        raise ValueError("O encontro precisa de pelo menos um inimigo")
+    pv = personagem.pv
+    pe = personagem.pe
+    ca = personagem.CA + nucleo.modificadores_ca(build)
+    rd = personagem.rd + nucleo.modificadores_rd(build)
+    pv_inimigos = [i.pv for i in inimigos]
+    pe_gasto = dano_causado = crits = acertos = usos_preciso = 0
+
+    for rodada in range(1, config.max_rodadas + 1):
+        # turno do personagem
+        alvo = next(k for k, v in enumerate(pv_inimigos) if v > 0)
+        habilidade, b, custo = _escolher_ataque(build, config, pe, usos_preciso)
+        if habilidade is not None:
+            pe -= custo
+            pe_gasto += custo
+            usos_preciso += b.gp_preciso
+
+            res = nucleo.usar_habilidade(habilidade, b)
+            if res.is_crit or res.ataque_total >= inimigos[alvo].ca:
+                dano = max(res.dano - inimigos[alvo].rd, 0)
+                pv_inimigos[alvo] -= dano
+                dano_causado += dano
+                acertos += 1
+                crits += res.is_crit
+            if all(v <= 0 for v in pv_inimigos):
+                return {"rodadas": rodada, "venceu": True, "pv_restante": pv, "pe_gasto": pe_gasto,
+                        "dano_causado": dano_causado, "acertos": acertos, "crits": crits}
+
+        # turno dos inimigos vivos
+        for inimigo, pv_i in zip(inimigos, pv_inimigos):
+            if pv_i <= 0:
+                continue
+            for _ in range(inimigo.ataques_por_rodada):
+                if dado(20)[0] + inimigo.ataque >= ca:
+                    faces, vezes, bonus = inimigo.dano
+                    pv -= max(sum(dado(faces, vezes)) + bonus - rd, 0)
+        if pv <= 0:
+            break
+
+    return {"rodadas": rodada, "venceu": False, "pv_restante": pv, "pe_gasto": pe_gasto,
+            "dano_causado": dano_causado, "acertos": acertos, "crits": crits}
+
+def _simular_lote(args) -> dict[str, np.ndarray]:
+    personagem, build, inimigos, config, n, seed = args
+    usar_backend(BackendNumpy(seed=seed))
+    resultados = [simular_encontro(personagem, build, inimigos, config) for _ in range(n)]
+    return {k: np.array([r[k] for r in resultados]) for k in resultados[0]}
+
+def simular_encontros(
+    personagem: Personagem,
+    build: Build,
+    inimigos: list[Inimigo],
+    config: ConfigEncontro,
+    n: int = 10_000,
+    processos: int | None = None,
+    seed: int | None = None,
+    tamanho_lote: int = 500,
+) -> dict[str, np.ndarray]:
+    """
+    Roda n encontros em paralelo (processos=None usa todos os núcleos; processos=1 roda no processo atual).
+    Retorna colunas por encontro: rodadas, venceu, pv_restante, pe_gasto, dano_causado, acertos, crits.
+    """
+    if n < 1:
+        raise ValueError(f"n precisa ser >= 1: {n}")
+    if not inimigos:
+        raise ValueError("O encontro precisa de pelo menos um inimigo")
+    lotes = [min(tamanho_lote, n - i) for i in range(0, n, tamanho_lote)]
+    sementes = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(len(lotes))]
+    tarefas = [(personagem, build, list(inimigos), config, tam, s) for tam, s in zip(lotes, sementes)]
+
+    if processos == 1:
+        partes = [_simular_lote(t) for t in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=processos or os.cpu_count()) as pool:
+            partes = list(pool.map(_simular_lote, tarefas))
+    return {k: np.concatenate([p[k] for p in partes]) for k in partes[0]}
+
+def resumo_encontros(res: dict[str, np.ndarray]) -> dict:
+    rodadas = res["rodadas"]
+    venceu = res["venceu"]
+    return {
+        "Encontros": len(rodadas),
+        "Vitórias (%)": round(100 * venceu.mean(), 2),
+        "Rodadas (média)": round(rodadas[venceu].mean(), 2) if venceu.any() else None,
+        "Rodadas (P10/P50/P90)": tuple(int(x) for x in np.percentile(rodadas[venceu], [10, 50, 90])) if venceu.any() else None,
+        "PV restante (média)": round(res["pv_restante"].mean(), 2),
+        "PE gasto (média)": round(res["pe_gasto"].mean(), 2),
+    }
+
+if __name__ == "__main__":
+    # ex.: python simulador_shoji.py --pv 300 --ca 25 --habilidade "Corte Oculto - Ritual" \
+    #          --custo "Ataque Armado=0" --custo "Corte Oculto - Ritual=4"
+    parser = argparse.ArgumentParser(description="Simula encontros da ficha contra um inimigo.")
+    parser.add_argument("--personagem", default="shoji")
+    parser.add_argument("--arma", default=None)
+    parser.add_argument("--postura", default="Nenhuma")
+    parser.add_argument("--estilo", default="Nenhum")
+    parser.add_argument("--kukan", default="Nenhum")
+    parser.add_argument("--habilidade", default="Ataque Armado")
+    parser.add_argument("--custo", action="append", default=[], metavar="HABILIDADE=PE",
+                        help="custo em PE de uma habilidade (repita; precisa da --habilidade e do Ataque Armado)")
+    parser.add_argument("--vantagem", action="store_true")
+    parser.add_argument("--elemental", action="store_true", help="Golpe Pessoal Elemental (+3d6)")
+    parser.add_argument("--letal", action="store_true", help="Golpe Pessoal Letal (+2 margem de ameaça)")
+    parser.add_argument("--preciso", action="store_true", help="Golpe Pessoal Preciso (vantagem)")
+    parser.add_argument("--pv", type=int, default=300)
+    parser.add_argument("--ca", type=int, default=25)
+    parser.add_argument("--rd", type=int, default=0)
+    parser.add_argument("--ataque", type=int, default=10)
+    parser.add_argument("-n", type=int, default=10_000)
+    parser.add_argument("--processos", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    a = parser.parse_args()
+
+    custos = {}
+    for item in a.custo:
+        nome, sep, pe = item.rpartition("=")
+        if not sep or not pe.strip().isdigit():
+            parser.error(f"--custo precisa ser HABILIDADE=PE: {item!r}")
+        custos[nome.strip()] = int(pe)
+    if a.n < 1:
+        parser.error("-n precisa ser >= 1")
+    try:
+        config = ConfigEncontro(custos, habilidade=a.habilidade)
+    except ValueError as e:
+        parser.error(str(e))
+
+    p = RegistroPersonagens().get(a.personagem)
+    b = Build(arma=a.arma or p.armas[0], postura=a.postura, estilo=a.estilo, kukan=a.kukan, vantagem=a.vantagem,
+              gp_elemental=a.elemental, gp_letal=a.letal, gp_preciso=a.preciso, nivel=p.nivel, For=p.For)
+    res = simular_encontros(p, b, [Inimigo(pv=a.pv, ca=a.ca, rd=a.rd, ataque=a.ataque)], config, a.n,
+                            a.processos, a.seed)
+    for k, v in resumo_encontros(res).items():
+        print(f"{k}: {v}")
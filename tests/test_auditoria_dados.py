@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+import auditoria_dados_shoji as auditoria
+from auditoria_dados_shoji import auditar_backend, p_normal, p_qui_quadrado
+from dados_shoji import BackendNumpy
+
+@pytest.mark.parametrize("chi2, gl", [(3.841, 1), (11.070, 5), (18.307, 10), (30.144, 19), (124.342, 100)])
+def test_p_qui_quadrado_quantis_de_5_porcento(chi2, gl):
+    assert p_qui_quadrado(chi2, gl) == pytest.approx(0.05, abs=5e-4)
+
+@pytest.mark.parametrize("chi2, gl, p", [(6.635, 1, 0.01), (2.706, 1, 0.10), (9.342, 10, 0.50)])
+def test_p_qui_quadrado_outros_quantis(chi2, gl, p):
+    assert p_qui_quadrado(chi2, gl) == pytest.approx(p, abs=5e-4)
+
+def test_p_qui_quadrado_extremos():
+    assert p_qui_quadrado(0, 5) == 1.0
+    assert p_qui_quadrado(1e4, 5) == pytest.approx(0.0, abs=1e-12)
+
+def test_p_normal():
+    assert p_normal(1.959964) == pytest.approx(0.05, abs=1e-6)
+    assert p_normal(-1.959964) == pytest.approx(0.05, abs=1e-6)
+
+def test_backend_passa():
+    df = auditar_backend(BackendNumpy(seed=1), n=200_000, faces=(6, 20))
+    assert df["Passou"].all()
+    assert (df["Amostras"] == 200_000).all()
+
+def test_dado_viciado_reprova():
+    rng = np.random.default_rng(1)
+    teste = auditoria.TesteDado(6)
+    teste.adicionar(rng.choice(np.arange(1, 7), size=60_000, p=[0.15, 0.15, 0.15, 0.15, 0.15, 0.25]))
+    r = teste.resultado()
+    assert not r["Passou"]
+    assert r["p χ²"] < 0.001
+
+def test_sequencia_alternada_reprova_runs():
+    teste = auditoria.TesteDado(6)
+    teste.adicionar(np.tile([1, 6, 2, 5, 3, 4], 10_000))  # faces equilibradas, mas alterna sempre
+    r = teste.resultado()
+    assert r["p χ²"] == pytest.approx(1.0)
+    assert not r["Passou"]
+
+def test_fora_da_faixa_reprova():
+    teste = auditoria.TesteDado(6)
+    teste.adicionar(np.array([1, 2, 3, 4, 5, 6, 7] * 100))
+    r = teste.resultado()
+    assert r["Fora da faixa"] == 100
+    assert not r["Passou"]
@@ -0,0 +1,22 @@
+import pytest
+from expressoes_shoji import compilar
+
+def test_compilar_soma_dados_iguais():
+    e = compilar("2d6 + 1d6 + 1d8 - 3")
+    assert dict(e.dados) == {6: 3, 8: 1}
+    assert e.bonus == -3
+    assert e.minimo == 1
+    assert e.maximo == 23
+
+@pytest.mark.parametrize("texto, mensagem", [
+    ("", "vazia"),
+    ("   ", "vazia"),
+    ("2d6 +", "inválida"),
+    ("2x6", "inválida"),
+    ("2d6 3", "inválida"),
+    ("1d8 - 1d6", "Subtrair dados"),
+    ("1d0", "sem faces"),
+])
+def test_compilar_erros(texto, mensagem):
+    with pytest.raises(ValueError, match=mensagem):
+        compilar(texto)
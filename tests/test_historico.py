@@ -0,0 +1,39 @@
+import random
+from collections import deque
+from dataclasses import replace
+from ataques_shoji import tabela_armas
+from historico_shoji import HistoricoRolagens
+from nucleo_shoji import Build, etapas_habilidade, usar_habilidade
+from resultado_shoji import como_dict
+
+def _rolagens(n: int, seed: int = 1):
+    rng = random.Random(seed)
+    armas, habilidades = list(tabela_armas), list(etapas_habilidade)
+    for i in range(n):
+        build = Build(rng.choice(armas), postura=rng.choice(['Nenhuma', 'Postura do Sol']),
+                      vantagem=rng.random() < .3, gp_elemental=rng.random() < .3, gp_letal=rng.random() < .3)
+        habilidade = rng.choice(habilidades)
+        yield f"{habilidade} #{i}", usar_habilidade(habilidade, build)  # título único: a tabela teria que crescer
+
+def test_remonta_as_ultimas_rolagens_e_a_tabela_nao_cresce():
+    h = HistoricoRolagens(20)
+    esperado = deque(maxlen=20)
+    for i, (msg, res) in enumerate(_rolagens(3000)):
+        h.adicionar(msg, res, ts=0)
+        esperado.appendleft((msg, como_dict(res)))
+        assert len(h._tabela) <= h._limite_tabela
+        if i % 250 == 0:
+            assert [(item["msg"], como_dict(item["payload"])) for item in h] == list(esperado)
+    assert [(item["msg"], como_dict(item["payload"])) for item in h.recentes(20)] == list(esperado)
+    assert not h._soltos
+
+def test_o_que_nao_cabe_fica_inteiro():
+    h = HistoricoRolagens(5)
+    _, res = next(_rolagens(1))
+    grande = replace(res, dano=2 ** 40)
+    lista_grande = replace(res, extras={**res.extras, "D20 (vantagem)": [300, 2]})
+    dict_solto = {"Habilidade": "Convergência", "Dano": 7}
+    for msg, payload in (("grande", grande), ("lista", lista_grande), ("dict", dict_solto)):
+        h.adicionar(msg, payload, ts=0)
+    assert [item["payload"] for item in h] == [dict_solto, lista_grande, grande]
+    assert len(h._soltos) == 3
@@ -0,0 +1,24 @@
+from metricas_shoji import Metricas
+
+def _valor(texto: str, nome: str) -> float:
+    linha = next(l for l in texto.splitlines() if l.startswith(nome + "{"))
+    return float(linha.rsplit(" ", 1)[1])
+
+def test_sum_e_count_so_sobem_com_a_janela_cheia():
+    m = Metricas(janela=3, arquivo=None)
+    anteriores = (0.0, 0.0)
+    for ms in (10, 1, 1, 1, 1, 1):
+        m.registrar("fase", ms)
+        texto = m.texto_prometheus()
+        atual = (_valor(texto, "shoji_fase_ms_sum"), _valor(texto, "shoji_fase_ms_count"))
+        assert atual[0] >= anteriores[0] and atual[1] > anteriores[1]
+        anteriores = atual
+    assert anteriores == (15.0, 6.0)
+
+def test_quantis_vem_da_janela():
+    m = Metricas(janela=3, arquivo=None)
+    for ms in (100, 100, 100, 1, 1, 1):
+        m.registrar("fase", ms)
+    r = m.resumo()["fase"]
+    assert r["p95_ms"] == 1.0
+    assert r["n"] == 6 and r["soma_total_ms"] == 303.0
@@ -0,0 +1,53 @@
+import contextvars
+from banco_shoji import BancoRolagens
+from dados_shoji import BackendNumpy, usar_backend
+from nucleo_shoji import Build
+from replay_shoji import Invocacao, conferir_sessao, executar
+
+def _gravar_sessao(banco: BancoRolagens, sessao: str, seed: int, invocacoes):
+    """Faz o que a ficha faz: grava a semente e cada rolagem com a invocação que a gerou."""
+    backend = BackendNumpy(seed=seed, tamanho_buffer=64)
+    banco.registrar_sessao(sessao, backend.seed, backend.tamanho_buffer)
+
+    def rodar():
+        usar_backend(backend)
+        for inv in invocacoes:
+            res = executar(inv)
+            banco.registrar(sessao, inv.nome, res, invocacao=inv.as_dict())
+
+    contextvars.copy_context().run(rodar)
+    banco.flush()
+
+def _invocacoes():
+    base = Build("Cardume de Adagas (G 3)", nivel=6, For=16)
+    return [
+        Invocacao.habilidade("Ataque Armado", base),
+        Invocacao.pericia("Atletismo", 15),
+        Invocacao.habilidade("Corte Oculto - Ritual", Build("Cardume de Adagas (G 3)", postura="Postura do Sol",
+                                                            gp_elemental=True, gp_preciso=True, nivel=6, For=16)),
+        Invocacao.habilidade("Execução Silenciosa", base),
+    ] * 25
+
+def test_gravar_e_refazer_confere(tmp_path):
+    banco = BancoRolagens(str(tmp_path / "rolagens.sqlite3"))
+    _gravar_sessao(banco, "s1", 1234, _invocacoes())
+    conferidas = conferir_sessao(banco, "s1")
+    assert len(conferidas) == 100
+    assert all(r["confere"] for r in conferidas)
+
+def test_refazer_ate_uma_rolagem(tmp_path):
+    banco = BancoRolagens(str(tmp_path / "rolagens.sqlite3"))
+    _gravar_sessao(banco, "s1", 99, _invocacoes())
+    ids = [r["id"] for r in conferir_sessao(banco, "s1")]
+    conferidas = conferir_sessao(banco, "s1", ate_id=ids[10])
+    assert [r["id"] for r in conferidas] == ids[:11]
+    assert conferidas[-1]["confere"]
+
+def test_outra_semente_diverge(tmp_path):
+    banco = BancoRolagens(str(tmp_path / "rolagens.sqlite3"))
+    _gravar_sessao(banco, "s1", 1, _invocacoes())
+    banco.registrar_sessao("s2", 2, 64)  # sessão com semente errada, mesmas rolagens
+    for item in banco.iterar(sessao="s1"):
+        banco.registrar("s2", item["msg"], item["payload"], invocacao=item["invocacao"])
+    banco.flush()
+    assert not all(r["confere"] for r in conferir_sessao(banco, "s2"))
@@ -0,0 +1,36 @@
+import pytest
+from nucleo_shoji import Build
+from personagens_shoji import RegistroPersonagens
+from simulador_shoji import ConfigEncontro, Inimigo, simular_encontros
+
+CUSTOS = {"Ataque Armado": 0, "Corte Oculto": 2}
+
+@pytest.fixture(scope="module")
+def personagem():
+    return RegistroPersonagens().get("shoji")
+
+def test_simula_e_reproduz_com_a_semente(personagem):
+    build = Build(personagem.armas[0], gp_elemental=True, nivel=personagem.nivel, For=personagem.For)
+    config = ConfigEncontro(CUSTOS, habilidade="Corte Oculto")
+    a = simular_encontros(personagem, build, [Inimigo()], config, n=50, processos=1, seed=3, tamanho_lote=20)
+    b = simular_encontros(personagem, build, [Inimigo()], config, n=50, processos=1, seed=3, tamanho_lote=20)
+    assert len(a["rodadas"]) == 50
+    assert all((a[k] == b[k]).all() for k in a)
+    assert (a["pe_gasto"] > 0).all()  # Corte Oculto + Elemental custam PE
+
+@pytest.mark.parametrize("kwargs", [
+    {"custos_pe": {"Corte Oculto": 2}, "habilidade": "Corte Oculto"},  # sem Ataque Armado
+    {"custos_pe": CUSTOS, "habilidade": "Golpe Inventado"},
+    {"custos_pe": CUSTOS, "max_rodadas": 0},
+])
+def test_config_invalida(kwargs):
+    with pytest.raises(ValueError):
+        ConfigEncontro(**kwargs)
+
+def test_sem_encontros_ou_sem_inimigos(personagem):
+    build = Build(personagem.armas[0])
+    config = ConfigEncontro(CUSTOS)
+    with pytest.raises(ValueError):
+        simular_encontros(personagem, build, [Inimigo()], config, n=0, processos=1)
+    with pytest.raises(ValueError):
+        simular_encontros(personagem, build, [], config, n=10, processos=1)